@@ -0,0 +1,61 @@
+"""
+Local stand-in for the ROR API.
+
+Serves canned ROR payloads over HTTP/1.1 keep-alive on 127.0.0.1, answering
+GET <path>/<ror> with the payload (and an ETag), 304 to a matching
+If-None-Match and 404 to unknown ids. Point a RORClient, or the scripts
+through ROR_API_URL, at its url.
+
+Usage:
+    with serve(payloads) as url:
+        client = RORClient(url)
+"""
+
+import json
+import threading
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+def handler(payloads):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            ror = self.path.rsplit('/', 1)[-1]
+            payload = payloads.get(ror)
+            if payload is None:
+                self.reply(404, b'{}')
+            elif self.headers.get('If-None-Match') == f'"{ror}"':
+                self.reply(304, b'')
+            else:
+                self.reply(200, json.dumps(payload).encode(), {'ETag': f'"{ror}"'})
+
+        def reply(self, status, body, headers=None):
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+@contextmanager
+def serve(payloads):
+    '''Serve payloads ({ror: record}) for the duration of the block; yields the base url.'''
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler(payloads))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}/organizations/"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Benchmark the issue and refresh pipelines on synthetic universes.
+
+Every stage runs in its own subprocess against a freshly generated universe.
+The universe is generated by yet another process, so the peak RSS reported
+is that of the stage (and the canned payloads it is given) alone. Git
+plumbing runs for real against the local synthetic repository; pushes and
+every GitHub call (issue updates, summaries, pull requests) are replaced by
+no-ops, ROR lookups are answered from canned payloads, and the repository
+prefix cache of the issue scripts is kept in the temporary directory rather
+than in ~/.cache.
+
+Stages:
+    ror_transform              update_ror.ror_to_institution per payload
+    ror_client                 RORClient.fetch_many against a local stand-in ROR API,
+                               checking every record it returns
+    process_organization_file  upgrade_organisations per file (commits queued, not written)
+    activity_run               activity.run per synthetic issue
+    institution_run            institution.run per synthetic issue
+    prepublish                 prepublish.py over the whole tree
+
+The import time of the issue scripts needs no universe and is checked on its
+own by startup_check.py.
+
+Usage:
+    python run_benchmarks.py [--sizes 100 1000 10000 100000] [--stages ...]
+                             [--output results.json] [--baseline baseline.json]
+                             [--tolerance 0.25] [--save-baseline]
+"""
+
+import os
+import sys
+import json
+import glob
+import time
+import resource
+import tempfile
+import argparse
+import platform
+import contextlib
+import subprocess
+from pathlib import Path
+from statistics import quantiles
+
+
+HERE = Path(__file__).resolve().parent
+sys.path.append(str(HERE))
+sys.path.append(str(HERE.parent / 'ISSUE_SCRIPT'))
+sys.path.append(str(HERE.parent / 'prepublish'))
+
+import synthetic
+import ror_standin
+
+
+STAGES = {}
+
+def stage(name):
+    def register(func):
+        STAGES[name] = func
+        return func
+    return register
+
+
+class CannedRecords:
+    '''Stands in for a ror_dump.RORDump, serving the synthetic payloads.'''
+
+    def __init__(self, payloads):
+        self.payloads = payloads
+
+    def get(self, ror):
+        return self.payloads.get(ror)
+
+
+def stub_github():
+    '''Replace every call that talks to GitHub or a remote with a no-op.'''
+    import cmipld
+    from cmipld.utils import git
+    import gitplumbing
+
+    noop = lambda *args, **kwargs: None
+    for name in ['update_summary', 'update_issue', 'update_issue_title', 'close_issue', 'newpull']:
+        setattr(git, name, noop)
+    git.issue_author = lambda number: {'name': 'bench', 'login': 'bench'}
+    git.url = lambda: 'https://github.com/example/universe'
+    git.url2io = lambda url: url
+    cmipld.reverse_mapping = lambda: {'https://github.com/example/universe': 'universal'}
+    gitplumbing.push = noop
+    os.environ.setdefault('ISSUE_NUMBER', '0')
+
+
+def timed(func, items):
+    times = []
+    for item in items:
+        start = time.perf_counter()
+        func(item)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+@stage('ror_transform')
+def bench_ror_transform(root, payloads, iterations):
+    import update_ror
+    return timed(lambda payload: update_ror.ror_to_institution(payload, 'BENCH_1'), payloads.values())
+
+
+@stage('ror_client')
+def bench_ror_client(root, payloads, iterations):
+    from ror_client import RORClient
+
+    rors = list(payloads)
+    chunks = [rors[i:i + iterations] for i in range(0, len(rors), iterations)][:20]
+
+    with ror_standin.serve(payloads) as url:
+        client = RORClient(url, max_workers=8)
+
+        def fetch(chunk):
+            records = client.fetch_many(chunk, max_workers=4)
+            for ror in chunk:
+                assert records[ror] == payloads[ror], f"stand-in record {ror} came back different"
+
+        times = timed(fetch, chunks)
+        assert client.fetch('missing') is None, "an unknown id should give None"
+    return times
+
+
+@stage('process_organization_file')
+def bench_process_organization_file(root, payloads, iterations):
+    import update_ror
+    import upgrade_organisations
+    import gitbatch
+
+    files = sorted(glob.glob('./src-data/organisation/*.json'))[:iterations]
+    batch = gitbatch.BatchCommitter()
+
+    def process(file):
+        with open(file) as f:
+            data = json.load(f)
+        payload = dict(payloads[data['ror']], name=data['ui-label'] + ' (renamed)')
+        fresh = update_ror.ror_to_institution(payload, data['validation-key'])
+        upgrade_organisations.process_organization_file(file, prefetched=fresh, author=('bench', 'bench@example.org'), batch=batch)
+
+    return timed(process, files)
+
+
+@stage('activity_run')
+def bench_activity_run(root, payloads, iterations):
+    stub_github()
+    import activity
+
+    issues = [{
+        'issue-type': 'activity',
+        'activity-id': f"BENCH{i}",
+        'activity-title': f"Benchmark activity {i}",
+        'description': 'A synthetic activity.',
+        'activity-webpage-/-citation': 'https://example.org',
+        'submitter': 'bench',
+    } for i in range(iterations)]
+
+    return timed(lambda issue: activity.run(issue, {}), issues)
+
+
+@stage('institution_run')
+def bench_institution_run(root, payloads, iterations):
+    stub_github()
+    import update_ror
+    import institution
+
+    update_ror.client.dump = CannedRecords(payloads)
+    rors = list(payloads)[:iterations]
+    issues = [{
+        'issue-type': 'institution',
+        'acronym': f"NEW{i}",
+        'ror': ror,
+        'full-name-of-the-organisation': payloads[ror]['name'],
+    } for i, ror in enumerate(rors)]
+
+    return timed(lambda issue: institution.run(issue, {'author': 'bench'}), issues)
+
+
+@stage('prepublish')
+def bench_prepublish(root, payloads, iterations):
+    import prepublish
+
+    def run(_):
+        sys.argv = ['prepublish.py', './src-data/']
+        prepublish.main()
+
+    # the first pass creates every alias, later passes find them up to date
+    return timed(run, range(max(2, min(iterations, 5))))
+
+
+def run_stage(name, size, iterations):
+    '''Run one stage on a fresh universe, in this process. Returns the result dict.'''
+    with tempfile.TemporaryDirectory() as base:
+        root, payload_file = os.path.join(base, 'universe'), os.path.join(base, 'payloads.json')
+        os.makedirs(root)
+        # generated by another process, so building it does not count towards this stage's peak RSS
+        subprocess.run([sys.executable, __file__, '--generate', root, '--size', str(size), '--output', payload_file],
+                       check=True)
+        with open(payload_file) as f:
+            payloads = json.load(f)
+
+        os.chdir(root)
+        os.environ.update({'GIT_AUTHOR_NAME': 'bench', 'GIT_AUTHOR_EMAIL': 'bench@example.org',
+                           'GIT_COMMITTER_NAME': 'bench', 'GIT_COMMITTER_EMAIL': 'bench@example.org',
+                           'ROR_CACHE': 'off', 'PREFIX_CACHE': os.path.join(base, 'prefix.json')})
+
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            times = STAGES[name](root, payloads, iterations)
+        total = time.perf_counter() - start
+
+    cuts = quantiles(times, n=100, method='inclusive') if len(times) > 1 else times * 99
+    return {
+        'stage': name,
+        'size': size,
+        'items': len(times),
+        'seconds': round(total, 4),
+        'throughput': round(len(times) / sum(times), 2) if sum(times) else None,
+        'p50_ms': round(cuts[49] * 1000, 3),
+        'p95_ms': round(cuts[94] * 1000, 3),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def compare(results, baseline, tolerance):
+    '''Return the regressions of results against a baseline, as printable strings.'''
+    previous = {(r['stage'], r['size']): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        before = previous.get((result['stage'], result['size']))
+        if not before or 'error' in result or 'error' in before:
+            continue
+        for metric, worse in [('p95_ms', 1), ('peak_rss_mb', 1), ('throughput', -1)]:
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * worse
+            if change > tolerance:
+                regressions.append(f"{result['stage']}@{result['size']}: {metric} {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the issue and refresh pipelines")
+    parser.add_argument("--sizes", type=int, nargs='+', default=[100, 1000, 10000, 100000], help="Universe sizes in terms")
+    parser.add_argument("--stages", nargs='+', default=list(STAGES), choices=list(STAGES), help="Stages to run")
+    parser.add_argument("--iterations", type=int, default=50, help="Issues/files per stage, where a stage takes a count")
+    parser.add_argument("--output", default='benchmark-results.json', help="Where to write the results")
+    parser.add_argument("--baseline", default=str(HERE / 'baseline.json'), help="Results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown before failing")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--stage", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--generate", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # child process: write a universe and its canned payloads
+    if args.generate:
+        with open(args.output, 'w') as f:
+            json.dump(synthetic.generate(args.generate, args.size), f)
+        return 0
+
+    # child process: run a single stage and print its result
+    if args.stage:
+        print(json.dumps(run_stage(args.stage, args.size, args.iterations)))
+        return 0
+
+    results = []
+    for size in args.sizes:
+        for name in args.stages:
+            proc = subprocess.run(
+                [sys.executable, __file__, '--stage', name, '--size', str(size), '--iterations', str(args.iterations)],
+                capture_output=True, text=True,
+            )
+            if proc.returncode:
+                result = {'stage': name, 'size': size, 'error': proc.stderr.strip().splitlines()[-1:]}
+                print(f"❌ {name}@{size}: {result['error']}")
+            else:
+                result = json.loads(proc.stdout.strip().splitlines()[-1])
+                print(f"⏱️  {name}@{size}: {result['throughput']}/s, p50 {result['p50_ms']}ms, "
+                      f"p95 {result['p95_ms']}ms, peak {result['peak_rss_mb']}MB")
+            results.append(result)
+
+    output = {
+        'meta': {'python': platform.python_version(), 'machine': platform.machine(), 'cpus': os.cpu_count(),
+                 'date': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+
+    # a stage that raised (e.g. a failed check in ror_client) fails the run
+    if any('error' in result for result in results):
+        return 1
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(output, f, indent=2)
+        print(f"📌 Saved baseline to {args.baseline}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"🐢 {regression}")
+        print(f"{'❌' if regressions else '✅'} {len(regressions)} regressions against {args.baseline}")
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Import-time budget of the issue scripts.
+
+Each script is imported a few times in a fresh interpreter with
+`python -X importtime`. The check fails if the median cumulative import time
+of a script is over the budget, or if importing it loads a package that the
+scripts only need once they are working on an issue (cmipld, pydantic, ...).
+No universe is generated: only startup is measured.
+
+Usage:
+    python startup_check.py [--budget 500] [--repeat 5] [--modules activity institution ...]
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+from pathlib import Path
+from statistics import median
+
+
+SCRIPTS = Path(__file__).resolve().parent.parent / 'ISSUE_SCRIPT'
+
+MODULES = ['activity', 'institution', 'update_ror', 'upgrade_organisations', 'batch_issues']
+
+# loaded on first use, never at import time
+DEFERRED = ['cmipld', 'pydantic', 'pyld', 'p_tqdm', 'rich', 'tqdm', 'numpy']
+
+
+def import_time(module):
+    '''(cumulative import time in seconds, top-level packages imported) of module in a fresh interpreter.'''
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join([str(SCRIPTS), os.environ.get('PYTHONPATH', '')])}
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                          capture_output=True, text=True, env=env)
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    seconds, packages = None, set()
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].strip()
+        packages.add(name.split('.')[0])
+        if name == module:
+            seconds = int(parts[1]) / 1e6
+    if seconds is None:
+        raise RuntimeError(f"no import time reported for {module}")
+    return seconds, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import time of the issue scripts")
+    parser.add_argument("--budget", type=float, default=500, help="Allowed median import time of a script, in ms")
+    parser.add_argument("--repeat", type=int, default=5, help="Imports per script")
+    parser.add_argument("--modules", nargs='+', default=MODULES, help="Scripts to check")
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        try:
+            runs = [import_time(module) for _ in range(args.repeat)]
+        except RuntimeError as err:
+            print(f"❌ {module}: import failed: {err}")
+            failed = True
+            continue
+
+        ms = median(seconds for seconds, _ in runs) * 1000
+        eager = sorted(set(DEFERRED) & runs[0][1])
+        ok = ms <= args.budget and not eager
+        failed = failed or not ok
+        print(f"{'✅' if ok else '❌'} {module}: {ms:.0f}ms (budget {args.budget:.0f}ms)"
+              + (f", imports {', '.join(eager)} at startup" if eager else ''))
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
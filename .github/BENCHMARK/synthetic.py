@@ -0,0 +1,106 @@
+"""
+Synthetic universes for the benchmarks.
+
+generate() writes a src-data tree of the requested number of terms, spread
+over a handful of categories with organisations making up half of them, and
+returns the canned ROR payloads the organisation files were built from. The
+tree is committed to a fresh git repository on a `main` branch so the issue
+scripts can run against it as they would on the real repository.
+"""
+
+import os
+import json
+import random
+import subprocess
+
+
+CATEGORIES = ['activity', 'frequency', 'realm', 'resolution', 'source_type']
+
+
+def ror_id(i):
+    return f"0{i:07x}"[-8:] + 'b'
+
+
+def ror_payload(i, rng=random):
+    '''A ROR v1 record shaped like the API responses.'''
+    words = ['Institute', 'Centre', 'University', 'Climate', 'Research', 'Ocean', 'Atmospheric', 'National']
+    name = ' '.join(rng.sample(words, 3)) + f' {i}'
+    return {
+        'id': f"https://ror.org/{ror_id(i)}",
+        'name': name,
+        'links': [f"https://org{i}.example.org"],
+        'established': 1950 + i % 70,
+        'types': ['Education'],
+        'labels': [{'label': name.upper(), 'iso639': 'en'}],
+        'aliases': [f"Org {i}"],
+        'acronyms': [f"O{i}"],
+        'addresses': [{'lat': rng.uniform(-90, 90), 'lng': rng.uniform(-180, 180), 'city': f"City {i % 500}"}],
+        'country': {'country_code': 'GB', 'country_name': 'United Kingdom'},
+    }
+
+
+def organisation(i, payload):
+    return {
+        'id': f"o{i}",
+        'type': ['wcrp:organisation', 'wcrp:institution', 'universal'],
+        'validation-key': f"O{i}",
+        'ror': payload['id'].split('/')[-1],
+        'ui-label': payload['name'],
+        'url': payload['links'],
+        'established': payload['established'],
+        'kind': 'Education',
+        'labels': [label['label'] for label in payload['labels']],
+        'aliases': payload['aliases'],
+        'acronyms': payload['acronyms'],
+        'location': {
+            'id': f"universal:location/{payload['id'].split('/')[-1]}",
+            'type': 'wcrp:location',
+            'lat': payload['addresses'][0]['lat'],
+            'lon': payload['addresses'][0]['lng'],
+            'city': payload['addresses'][0]['city'],
+            'country': list(payload['country'].values()),
+        },
+    }
+
+
+def term(category, i):
+    return {
+        'id': f"{category[:3]}{i}",
+        'type': [f"wcrp:{category}", 'universal'],
+        'validation-key': f"{category[:3].upper()}{i}",
+        'ui-label': f"{category} term {i}",
+        'description': f"Synthetic {category} term number {i}.",
+    }
+
+
+def generate(root, size, seed=0, git=True):
+    '''Write a universe of size terms under root/src-data and return {ror: payload}.'''
+    rng = random.Random(seed)
+    src = os.path.join(root, 'src-data')
+    payloads = {}
+
+    organisations = size // 2
+    for category in ['organisation', *CATEGORIES]:
+        os.makedirs(os.path.join(src, category), exist_ok=True)
+        with open(os.path.join(src, category, '_context'), 'w') as f:
+            json.dump({'@context': {'@base': f"https://example.org/{category}/"}}, f)
+
+    for i in range(organisations):
+        payload = ror_payload(i, rng)
+        payloads[ror_id(i)] = payload
+        with open(os.path.join(src, 'organisation', f"o{i}.json"), 'w') as f:
+            json.dump(organisation(i, payload), f, indent=4)
+
+    for i in range(size - organisations):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        data = term(category, i)
+        with open(os.path.join(src, category, f"{data['id']}.json"), 'w') as f:
+            json.dump(data, f, indent=4)
+
+    if git:
+        env = {**os.environ, 'GIT_AUTHOR_NAME': 'bench', 'GIT_AUTHOR_EMAIL': 'bench@example.org',
+               'GIT_COMMITTER_NAME': 'bench', 'GIT_COMMITTER_EMAIL': 'bench@example.org'}
+        for cmd in (['init', '-q', '-b', 'main'], ['add', '-A'], ['commit', '-q', '-m', 'synthetic universe']):
+            subprocess.run(['git', *cmd], cwd=root, env=env, check=True)
+
+    return payloads
@@ -1,37 +1,109 @@
 import sys
-# from pathlib import Path
+from pathlib import Path
 # set the path to read local files 
-# sys.path.append(str(Path(--file--).parent))
+sys.path.append(str(Path(__file__).parent))
 
 import json,os
-from cmipld.utils import git
-from  cmipld.tests import jsonld as tests
-from cmipld.utils.json import sorted_json
 from collections import OrderedDict
 
-from cmipld import reverse_mapping
+import gitplumbing
+import timing
 
-rmap = reverse_mapping()
-prefix = rmap[git.url2io(git.url())]
 
+# prefixes of the known repositories, used only when the lookup is not possible
+PREFIXES = Path(__file__).parent / 'prefixes.json'
+PREFIX_CACHE = os.environ.get('PREFIX_CACHE', '~/.cache/wcrp-universe/prefix.json')
 
+_prefix = None
+
+
+def get_prefix():
+    '''
+    The registered prefix of this repository, looked up on first use.
+
+    Prefixes are keyed by the repository URL in PREFIX_CACHE ('off' disables
+    it), which is kept between local runs but starts empty on a CI runner.
+    Repositories it does not know are looked up in cmipld's reverse mapping;
+    the committed PREFIXES file is only read when that lookup fails, and its
+    answer is not cached, so the mapping stays the source of truth.
+    '''
+    global _prefix
+    if _prefix is not None:
+        return _prefix
+
+    from cmipld.utils import git
+    repo = git.url2io(git.url())
+
+    cache = {}
+    path = None if PREFIX_CACHE.lower() == 'off' else os.path.expanduser(PREFIX_CACHE)
+    if path and os.path.exists(path):
+        with open(path, 'r') as f:
+            cache = json.load(f)
+
+    if repo not in cache:
+        from cmipld import reverse_mapping
+        try:
+            with timing.span('reverse_mapping'):
+                cache[repo] = reverse_mapping()[repo]
+        except Exception as err:
+            with open(PREFIXES, 'r') as f:
+                known = json.load(f)
+            if repo not in known:
+                raise
+            print(f"⚠️  Prefix lookup failed ({err}), using {PREFIXES.name}")
+            _prefix = known[repo]
+            return _prefix
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump(cache, f, indent=2)
+
+    _prefix = cache[repo]
+    return _prefix
+
+
+def activity_data(issue):
+    '''The output file and sorted record of the activity an issue describes.'''
+    acronym = issue['activity-id']
+    id = acronym.lower()
+    
+    outfile = f'./src-data/{issue['issue-type']}/{id}.json'
+    
+    data = {
+            "id": f"{id}",
+            "type": [f'wcrp:{issue['issue-type']}',get_prefix()],
+            
+            "validation-key": acronym,    
+            "ui-label": issue['activity-title'],
+            "description": issue['description'],
+            "url": issue['activity-webpage-/-citation']
+        }   
+    
+    from cmipld.utils.json import sorted_json
+    return outfile, sorted_json(data)
+
+
+def author_of(issue):
+    if 'submitter' in issue:  # override the current author
+        author = issue['submitter']
+        return {'name':author,'login':f"{author}@users.noreply.github.com"}
+    from cmipld.utils import git
+    return git.issue_author(os.environ['ISSUE_NUMBER'])
 
 
 def run(issue,packet):
     # print('issue',issue)
+    from cmipld.utils import git
     
     # also breaks the issue updates for the same reason 
     git.update_summary(f"### Issue content\n ```json\n{json.dumps(issue,indent=4)}\n```")
-    path = f'./src-data/{issue['issue-type']}/'
-    
     acronym = issue['activity-id']
-    id = acronym.lower()
-    
-    outfile = path+id+'.json'
+    outfile, data = activity_data(issue)
     
     # check if the file already exists
-    mainfiles = git.getfilenames('main')
-    if outfile in mainfiles:
+    with timing.span('git.exists'):
+        exists = gitplumbing.exists('main', outfile)
+    if exists:
         git.close_issue(f'File {outfile} already exists, please check and correct. ')
         sys.exit('File already exists on main')
     
@@ -39,28 +111,8 @@ def run(issue,packet):
     branch = title.replace(' ','_').lower()
     
     git.update_issue_title(title)
-    git.newbranch(branch)
-    os.popen(f"git checkout {branch}")
-    
-    git.update_summary(f"### Branch created: {branch}, {os.popen('git branch').read()}")
     
-    gb = git.getbranch()
-    assert gb == branch, f'the branch is not the same (not created) "{gb}" != "{branch}"'
     
-    
-    data = {
-            "id": f"{id}",
-            "type": [f'wcrp:{issue['issue-type']}',prefix],
-            
-            "validation-key": acronym,    
-            "ui-label": issue['activity-title'],
-            "description": issue['description'],
-            "url": issue['activity-webpage-/-citation']
-        }   
-
-        
-    data = sorted_json(data)
-
     git.update_summary(f"### Data content\n ```json\n{json.dumps(data,indent=4)}\n```")
     
     # tests.run_checks(tests.activity.activity_model,data)
@@ -68,29 +120,28 @@ def run(issue,packet):
     git.update_summary(f"### Content has no errors. \n```")
 
 
-    print('writing to',outfile)
-    json.dump(data,open(outfile,'w'),indent=4)
-    print('done')
-
 
     
     # if we are happy, and have gotten this far: 
     
-    if 'submitter' in issue:  # override the current author
-        author = issue['submitter']
-        author = {'name':author,'login':f"{author}@users.noreply.github.com"}
-    else:
-        author = git.issue_author(os.environ['ISSUE_NUMBER'])
+    author = author_of(issue)
 
     print('Author',author)
     
     
-    # git.commit-override-author(acronym,issue["issue-type"])
-    git.commit_one(outfile,author,comment=f'New entry {acronym} in {issue["issue-type"]} files.' ,branch=branch)
-    print('CREATING PULL\n',branch, author,title,os.environ['ISSUE_NUMBER'])
-    
-    git.newpull(branch,author,json.dumps(data,indent=4),title,os.environ['ISSUE_NUMBER'])
+    # write the file straight into a commit on the new branch, without a checkout
+    print('writing to',outfile)
+    with timing.span('git.commit'):
+        gitplumbing.commit_files(branch, {outfile: json.dumps(data,indent=4)}, f'New entry {acronym} in {issue["issue-type"]} files.', author, base='main')
+    with timing.span('git.push'):
+        gitplumbing.push(branch)
+    git.update_summary(f"### Branch created: {branch}")
+    print('done')
     
+    print('CREATING PULL\n',branch, author,title,os.environ['ISSUE_NUMBER'])
     
-        
+    with timing.span('git.newpull'):
+        gitplumbing.switch(branch)    # newpull opens the PR from the checked-out branch
+        git.newpull(branch,author,json.dumps(data,indent=4),title,os.environ['ISSUE_NUMBER'])
     
+    timing.report(git.update_summary)
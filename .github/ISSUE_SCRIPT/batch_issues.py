@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Process many queued activity and institution issues in one run.
+
+activity.run and institution.run handle one issue per process, paying for the
+repository prefix lookup, the universe load, the similarity index and a
+branch and pull request every time. This driver loads that shared state once:
+
+    - the list of files on main (one git ls-tree)
+    - the organisation and activity terms (universe_store)
+    - the organisation similarity index
+    - the reference index of src-data (refindex)
+    - every ROR record, fetched concurrently
+
+Every entry is built with the same functions the single-issue scripts use.
+Institution records are validated together with batch_validation, and the
+valid entries are then checked, in order, against existing data and against
+the entries accepted before them (file, acronym and ROR collisions,
+references that do not resolve). Accepted entries are committed either on
+one branch per issue or, with --single-branch, as one commit each (keeping
+each submitter as its author) on a single branch with one pull request. A
+failed push or pull request fails its own entries only: every entry is still
+reported.
+
+The input is a JSON list of issue payloads, as parsed from the issue forms.
+An item may also be {"number": 12, "issue": {...}, "packet": {...}}. Items
+without a number are processed too, but no issue is linked or commented on.
+
+Usage:
+    python batch_issues.py issues.json [--single-branch NAME] [--dry-run] [--report batch-report.json]
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+from pathlib import Path
+from contextlib import contextmanager
+
+# set the path to read local files
+sys.path.append(str(Path(__file__).parent))
+
+import timing
+import gitplumbing
+import universe_store
+import similarity_index
+import refindex
+import batch_validation
+
+
+ORGANISATION_TYPES = ['institution', 'consortium']
+
+
+class Entry:
+    '''One queued issue and what became of it.'''
+
+    def __init__(self, position, item):
+        if 'issue' in item:
+            self.issue, self.packet, self.number = item['issue'], item.get('packet', {}), item.get('number')
+        else:
+            self.issue, self.packet, self.number = item, {}, None
+        number = self.number or self.issue.get('number')
+        # entries without an issue number are never linked to or commented on
+        self.number = str(number) if number else None
+        self.key = self.number or f"batch-{position}"
+        self.label = f"#{self.number}" if self.number else f"entry {position}"
+        self.kind = self.issue.get('issue-type')
+        self.outfile = self.data = self.author = self.branch = None
+        self.errors, self.warnings, self.notes = [], [], []
+
+    @property
+    def status(self):
+        if self.errors:
+            # an entry with a branch was accepted, but its submission failed
+            return 'failed' if self.branch else 'rejected'
+        return 'submitted' if self.branch else 'accepted'
+
+    def result(self):
+        return {
+            'number': self.number, 'type': self.kind, 'file': self.outfile, 'status': self.status,
+            'branch': self.branch, 'errors': self.errors, 'warnings': self.warnings,
+        }
+
+
+@contextmanager
+def for_issue(number):
+    '''Point the git helpers, which read ISSUE_NUMBER, at one issue (or at none).'''
+    previous = os.environ.get('ISSUE_NUMBER')
+    if number:
+        os.environ['ISSUE_NUMBER'] = number
+    else:
+        os.environ.pop('ISSUE_NUMBER', None)
+    try:
+        yield
+    finally:
+        if previous is None:
+            os.environ.pop('ISSUE_NUMBER', None)
+        else:
+            os.environ['ISSUE_NUMBER'] = previous
+
+
+def main_files(ref='main'):
+    '''Every path under src-data on ref, from a single listing.'''
+    out = subprocess.run(['git', 'ls-tree', '-r', '-z', '--name-only', ref, '--', 'src-data/'],
+                         capture_output=True, check=True).stdout
+    return {os.path.normpath(path) for path in out.decode().split('\0') if path}
+
+
+def field_errors(model, values):
+    '''Pydantic errors of a field model as strings, without closing any issue.'''
+    from pydantic import ValidationError
+    try:
+        model(**values)
+    except ValidationError as err:
+        return [f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in err.errors()]
+    return []
+
+
+class Batch:
+
+    def __init__(self, entries):
+        self.entries = entries
+        kinds = {entry.kind for entry in entries}
+        organisations = bool(kinds & set(ORGANISATION_TYPES))
+
+        with timing.span('batch.shared_state'):
+            self.existing = main_files()
+            self.store = universe_store.Store.from_checkout('./src-data/', categories=['organisation', 'activity'])
+            self.index = similarity_index.TrigramIndex.from_store(self.store) if organisations else None
+            self.references = refindex.ReferenceIndex.from_directory('./src-data/')
+
+        self.seen_files, self.seen_rors = {}, {}
+        self.fetched = {}
+        if organisations:
+            self.prefetch([e for e in entries if e.kind in ORGANISATION_TYPES and e.issue.get('ror') != 'pending'])
+
+    def prefetch(self, entries):
+        import update_ror
+        pairs = [(e.issue['ror'], e.issue['acronym']) for e in entries]
+        for entry, data in zip(entries, update_ror.get_institutions(pairs)):
+            self.fetched[entry.key] = data
+
+    def build(self, entry):
+        '''Build the record of one entry and check its fields.'''
+        issue = entry.issue
+
+        if entry.kind == 'activity':
+            import activity
+            entry.outfile, entry.data = activity.activity_data(issue)
+            if not entry.number and 'submitter' not in issue:
+                entry.errors.append("Needs an issue number or a submitter to take the author from")
+                return
+            with for_issue(entry.number):
+                entry.author = activity.author_of(issue)
+
+        elif entry.kind in ORGANISATION_TYPES:
+            import institution
+            from cmipld.tests import jsonld as tests
+
+            key = issue['acronym']
+            entry.errors += field_errors(tests.field_test(tests.components.id.id_field), {'id': key.lower()})
+            if issue['ror'] != 'pending':
+                entry.errors += field_errors(tests.field_test(tests.organisation.ror.ror_field), {'ror': issue['ror']})
+
+            fetched = self.fetched.get(entry.key)
+            if isinstance(fetched, Exception):
+                entry.errors.append(f"ROR lookup failed: {fetched}")
+                return
+
+            entry.data = institution.organisation_data(issue, fetched)
+            entry.outfile = institution.path + key.lower() + '.json'
+            entry.author = institution.author_of(issue, entry.packet)
+
+        else:
+            entry.errors.append(f"Issue type {entry.kind!r} cannot be processed in a batch")
+
+    def check(self, entry):
+        '''Check a valid entry against existing data and the entries accepted before it, then register it.'''
+        if entry.kind in ORGANISATION_TYPES:
+            import institution
+            issue, key = entry.issue, entry.issue['acronym']
+            entry.warnings += institution.name_warnings(issue, entry.data, self.store)
+            names = [issue.get('full-name-of-the-organisation'), key, entry.data.get('ui-label')]
+            entry.notes.append(self.index.report(*filter(None, names), exclude={key.lower()}))
+
+        # collisions with main and with the rest of the batch
+        path = os.path.normpath(entry.outfile)
+        if path in self.existing:
+            entry.errors.append(f"File {entry.outfile} already exists on main")
+        elif path in self.seen_files:
+            entry.errors.append(f"File {entry.outfile} is also submitted by {self.seen_files[path]}")
+
+        category = 'organisation' if entry.kind in ORGANISATION_TYPES else entry.kind
+        for target, fields in self.references.check(entry.data, category).items():
+            entry.errors.append(f"{', '.join(fields)} refers to {target}, which does not exist")
+
+        ror = entry.data.get('ror')
+        if ror and ror != 'pending':
+            if ror in self.seen_rors:
+                entry.errors.append(f"ROR {ror} is also submitted by {self.seen_rors[ror]}")
+            elif ror in self.store.by_ror:
+                entry.warnings.append(f"ROR {ror} is already registered as {self.store.by_ror[ror].id}")
+
+        if not entry.errors:
+            # later entries are checked against this one
+            self.seen_files[path] = entry.label
+            if ror and ror != 'pending':
+                self.seen_rors[ror] = entry.label
+            self.references.add(category, entry.data, path)
+            term = universe_store.Term.from_json(category, entry.data, path=entry.outfile)
+            self.store.add(term)
+            if self.index is not None and entry.kind in ORGANISATION_TYPES:
+                self.index.add_term(term)
+
+    def validate(self):
+        '''Validate every organisation record of the batch in one pydantic call.'''
+        members = [e for e in self.entries if not e.errors and e.kind in ORGANISATION_TYPES]
+        if not members:
+            return
+        with timing.span('pydantic.batch'):
+            errors = batch_validation.validate_records([e.data for e in members], keys=[e.key for e in members])
+        by_key = {e.key: e for e in members}
+        for key, loc, msg in zip(errors['key'], errors['loc'], errors['msg']):
+            by_key[key].errors.append(f"{loc}: {msg}")
+
+    def run(self):
+        '''Build and validate every entry, then check them in order: only valid entries are registered.'''
+        for entry in self.entries:
+            with timing.span('batch.build'):
+                try:
+                    self.build(entry)
+                except Exception as err:
+                    entry.errors.append(f"{type(err).__name__}: {err}")
+        self.validate()
+        for entry in self.entries:
+            if entry.errors:
+                continue
+            with timing.span('batch.check'):
+                try:
+                    self.check(entry)
+                except Exception as err:
+                    entry.errors.append(f"{type(err).__name__}: {err}")
+        return [e for e in self.entries if not e.errors]
+
+
+def message(entry):
+    return f"New entry {entry.data['validation-key']} in {entry.kind} files."
+
+
+def title(entry):
+    '''The pull request title and branch the single-issue script would use.'''
+    key = entry.data['validation-key']
+    if entry.kind == 'activity':
+        title = f'New {entry.kind.capitalize()}  {key}'
+        return title, title.replace(' ','_').lower()
+    title = f'{entry.kind.capitalize()}_{key}'
+    return title, title
+
+
+def pull_request(branch, author, content, name, number):
+    '''Open the pull request of a pushed branch; linked to its issue only when there is one.'''
+    gitplumbing.switch(branch)    # newpull opens the PR from the checked-out branch
+    if number:
+        from cmipld.utils import git
+        git.newpull(branch, author, content, name, number)
+        return
+    if subprocess.run(['gh', 'pr', 'view', branch], capture_output=True).returncode == 0:
+        return    # the push updated the open pull request
+    body = f"Adding the following new data:\n\n```js\n{content}\n```\n"
+    subprocess.run(['gh', 'pr', 'create', '--base', 'main', '--head', branch, '--title', name, '--body', body],
+                   capture_output=True, check=True)
+
+
+def failure(err):
+    if isinstance(err, subprocess.CalledProcessError) and err.stderr:
+        err = (err.stderr.decode() if isinstance(err.stderr, bytes) else err.stderr).strip()
+    return f"Submission failed: {err}"
+
+
+def submit_each(accepted):
+    '''One branch and pull request per issue, as the single-issue scripts do.'''
+    for entry in accepted:
+        name, entry.branch = title(entry)
+        content = json.dumps(entry.data, indent=4)
+        with for_issue(entry.number), timing.span('batch.submit'):
+            # a rejected push or pull request fails this entry only
+            try:
+                gitplumbing.commit_files(entry.branch, {entry.outfile: content}, message(entry), entry.author, base='main')
+                gitplumbing.push(entry.branch)
+                pull_request(entry.branch, entry.author, content, name, entry.number)
+            except Exception as err:
+                entry.errors.append(failure(err))
+
+
+def submit_single(accepted, branch):
+    '''Every accepted entry as its own commit, by its own author, on one branch with one pull request.'''
+    base = 'main'
+    committed = []
+    for entry in accepted:
+        entry.branch = branch
+        with timing.span('git.commit'):
+            try:
+                gitplumbing.commit_files(branch, {entry.outfile: json.dumps(entry.data, indent=4)},
+                                         message(entry) + (f" ({entry.label})" if entry.number else ''),
+                                         entry.author, base=base)
+            except Exception as err:
+                entry.errors.append(failure(err))
+                continue
+        base = branch
+        committed.append(entry)
+    if not committed:
+        return
+
+    numbered = [entry for entry in committed if entry.number]
+    content = json.dumps([entry.data for entry in committed], indent=4)
+    try:
+        with timing.span('git.push'):
+            gitplumbing.push(branch)
+        with for_issue(numbered[0].number if numbered else None), timing.span('git.newpull'):
+            pull_request(branch, committed[0].author, content, f"Batch of {len(committed)} new entries",
+                         ', #'.join(entry.number for entry in numbered))
+    except Exception as err:
+        for entry in committed:
+            entry.errors.append(failure(err))
+
+
+def report_table(entries):
+    rows = [
+        "### Batch results",
+        "| Issue | Type | File | Status | Problems |",
+        "|---|---|---|---|---|",
+    ]
+    for entry in entries:
+        problems = '<br>'.join(entry.errors + [w.replace('*Warning:* \n ', '⚠️ ') for w in entry.warnings])
+        rows.append(f"| {entry.label} | {entry.kind} | {entry.outfile or ''} | {entry.status} | {problems} |")
+    return '\n'.join(rows)
+
+
+def comment(entries):
+    '''Tell each issue what happened to it.'''
+    from cmipld.utils import git
+
+    for entry in entries:
+        if not entry.number:
+            continue
+        lines = [f"Processed in a batch: **{entry.status}**" + (f" on branch `{entry.branch}`" if entry.branch else '')]
+        lines += [f"- ❌ {error}" for error in entry.errors]
+        lines += [f"- {warning}" for warning in entry.warnings]
+        with for_issue(entry.number):
+            try:
+                git.update_issue('\n'.join(lines), err=False, summarize=False)
+            except Exception as err:
+                print(f"⚠️  Could not comment on {entry.label}: {err}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process a queue of activity and institution issues in one run")
+    parser.add_argument("issues", help="JSON file with a list of issue payloads")
+    parser.add_argument("--single-branch", metavar="NAME", help="Put every accepted entry on one branch and pull request")
+    parser.add_argument("--dry-run", action="store_true", help="Build and check the entries without committing")
+    parser.add_argument("--no-comment", action="store_true", help="Do not comment the result on each issue")
+    parser.add_argument("--report", help="Write the per-issue results as JSON to this file")
+    args = parser.parse_args()
+
+    with open(args.issues, 'r', encoding='utf-8') as f:
+        entries = [Entry(i, item) for i, item in enumerate(json.load(f))]
+
+    batch = Batch(entries)
+    accepted = batch.run()
+    print(f"📋 {len(accepted)} of {len(entries)} entries accepted")
+
+    if accepted and not args.dry_run:
+        if args.single_branch:
+            submit_single(accepted, args.single_branch)
+        else:
+            submit_each(accepted)
+
+    from cmipld.utils import git
+    git.update_summary(report_table(entries))
+    for entry in entries:
+        for note in entry.notes:
+            git.update_summary(f"#### {entry.label}\n{note}")
+
+    if not args.dry_run and not args.no_comment:
+        comment(entries)
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump([entry.result() for entry in entries], f, indent=2)
+
+    timing.report(git.update_summary)
+    return 1 if any(entry.errors for entry in entries) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+Batch pydantic validation of organisation records.
+
+Records are grouped by kind (institution / consortium) and each group is
+validated in one call through a TypeAdapter over a list of the cmipld model,
+so the schema is compiled once per kind instead of once per record. Every
+error of every record is returned in a columnar dict of lists, which can be
+rendered as a rich table or dumped as a JSON report.
+
+Usage:
+    errors = validate_records(records, keys=files)
+    print_table(errors)
+
+    python batch_validation.py --benchmark 10000
+"""
+
+import sys
+import time
+from functools import lru_cache
+
+
+COLUMNS = ['key', 'kind', 'ror', 'validation-key', 'loc', 'msg']
+
+
+def record_kind(record):
+    types = record.get('type', [])
+    for kind in ['institution', 'consortium']:
+        if f'wcrp:{kind}' in types:
+            return kind
+    return None
+
+
+@lru_cache(maxsize=None)
+def adapter(kind):
+    '''The TypeAdapter over a list of records of this kind, built once.'''
+    from pydantic import TypeAdapter
+    from cmipld.tests.jsonld import organisation
+    return TypeAdapter(list[getattr(organisation, kind)])
+
+
+def new_errors():
+    return {column: [] for column in COLUMNS}
+
+
+def add_error(errors, key, kind, record, loc, msg):
+    errors['key'].append(key)
+    errors['kind'].append(kind)
+    errors['ror'].append(record.get('ror'))
+    errors['validation-key'].append(record.get('validation-key'))
+    errors['loc'].append('.'.join(str(part) for part in loc))
+    errors['msg'].append(msg)
+
+
+def validate_records(records, keys=None, errors=None):
+    '''
+    Validate a list of institution and consortium records.
+
+    keys identify each record in the output (default: its position). Returns
+    the columnar error dict; a record with several problems has several rows.
+    '''
+    from pydantic import ValidationError
+    from cmipld.tests.jsonld import organisation
+
+    keys = list(range(len(records))) if keys is None else list(keys)
+    errors = new_errors() if errors is None else errors
+
+    groups = {}
+    for key, record in zip(keys, records):
+        groups.setdefault(record_kind(record), []).append((key, record))
+
+    for kind, members in groups.items():
+        if kind is None or not hasattr(organisation, kind):
+            continue
+
+        batch = [record for _, record in members]
+        try:
+            adapter(kind).validate_python(batch)
+        except ValidationError as err:
+            for e in err.errors():
+                key, record = members[e['loc'][0]]
+                add_error(errors, key, kind, record, e['loc'][1:], e['msg'])
+
+    return errors
+
+
+def print_table(errors):
+    from rich.console import Console
+    from rich.table import Table
+    from rich.text import Text
+    console = Console()
+
+    console.print(Text("Validation Errors", style="bold red underline"))
+
+    table = Table(show_header=True, header_style="bold white")
+    table.add_column("Type", style="bold green")
+    table.add_column("Item", style="bold blue")
+    table.add_column("Warnings", style="red")
+
+    for kind, ror, validation_key, loc, msg in zip(errors['kind'], errors['ror'], errors['validation-key'], errors['loc'], errors['msg']):
+        table.add_row(kind, f"{ror}: {validation_key}", f"[{loc}]:\n {msg}")
+
+    console.print(table)
+
+
+def benchmark(n=10000):
+    '''Time validate_records over n synthetic institution records.'''
+    import update_ror
+
+    payload = {
+        'id': 'https://ror.org/04cg70g73',
+        'name': 'Atmospheric and Environmental Research',
+        'links': ['http://www.aer.com/'],
+        'types': ['Company'],
+        'labels': [],
+        'aliases': [],
+        'acronyms': ['AER'],
+        'addresses': [{'lat': 42.5, 'lng': -71.2, 'city': 'Lexington'}],
+        'country': {'country_code': 'US', 'country_name': 'United States'},
+    }
+    records = [update_ror.ror_to_institution(payload, f'AER{i}') for i in range(n)]
+
+    start = time.perf_counter()
+    adapter('institution')
+    compiled = time.perf_counter()
+    errors = validate_records(records)
+    done = time.perf_counter()
+
+    print(f"{n} records: schema {compiled - start:.3f}s, validation {done - compiled:.3f}s "
+          f"({n / (done - compiled):,.0f} records/s), {len(errors['key'])} errors")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark batch validation of organisation records")
+    parser.add_argument("--benchmark", type=int, default=10000, help="Number of records to validate")
+    args = parser.parse_args()
+
+    sys.exit(benchmark(args.benchmark))
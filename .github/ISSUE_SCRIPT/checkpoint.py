@@ -0,0 +1,91 @@
+"""
+Append-only checkpoint journal for long, resumable runs.
+
+Each completed entry is appended as one JSON line and synced to disk before
+the run moves on, so after a crash or a cancelled job the journal holds
+exactly the entries that were finished. Opening the journal with resume=True
+reads them back (a line torn by the crash is cut off); otherwise a new journal
+is started. A run that reaches its end removes the journal with finish().
+
+Usage:
+    with Journal('.upgrade_organisations.journal', resume=args.resume) as journal:
+        for key in keys:
+            if key in journal:
+                continue
+            ...
+            journal.record_many([{'key': key, 'result': 'updated'}])
+        journal.finish()
+"""
+
+import os
+import json
+import threading
+from pathlib import Path
+
+
+class Journal:
+
+    def __init__(self, path, resume=False):
+        self.path = Path(path)
+        self.done = {}
+        self._lock = threading.Lock()
+        if resume and self.path.exists():
+            self._load()
+            self._file = open(self.path, 'a', encoding='utf-8')
+        else:
+            self._file = open(self.path, 'w', encoding='utf-8')
+
+    def _load(self):
+        good = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b'\n'):
+                    break
+                self.done[entry['key']] = entry
+                good += len(line)
+        # drop a half-written last line, so new entries start on a line of their own
+        if good != self.path.stat().st_size:
+            os.truncate(self.path, good)
+
+    def __contains__(self, key):
+        return key in self.done
+
+    def __len__(self):
+        return len(self.done)
+
+    def get(self, key):
+        return self.done.get(key)
+
+    def record_many(self, entries):
+        '''Append entries (dicts with a 'key') and sync them to disk.'''
+        if not entries:
+            return
+        lines = ''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in entries)
+        with self._lock:
+            self._file.write(lines)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            for entry in entries:
+                self.done[entry['key']] = entry
+
+    def record(self, key, **fields):
+        self.record_many([{'key': key, **fields}])
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def finish(self):
+        '''The run is complete: remove the journal so the next run starts afresh.'''
+        self.close()
+        self.path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Spatial index over the organisation locations.
+
+Every organisation with a location is packed into NumPy arrays: ids, latitude
+and longitude, and the matching unit vectors on the sphere. Nearest-k and
+within-radius queries take one point or arrays of points and are answered in
+a single vectorised call. With scipy installed, a KD-tree over the unit
+vectors is used (chord distance is monotonic in great-circle distance);
+without it, queries fall back to a vectorised haversine over every point.
+
+The packed arrays can be saved to a single .npz file, so consumers can load
+the index without parsing the organisation files.
+
+Usage:
+    index = GeoIndex.from_directory('./src-data/organisation/')
+    ids, km = index.nearest(51.75, -1.25, k=5)
+    ids, km = index.nearest(lats, lons, k=3)          # arrays of shape (len(lats), 3)
+    index.within(51.75, -1.25, radius_km=50)
+    index.country('GB')
+
+    python geo_index.py --near 51.75 -1.25 [-k 5]
+    python geo_index.py --within 51.75 -1.25 50
+    python geo_index.py --country GB
+    python geo_index.py --save locations.npz
+"""
+
+import os
+import sys
+import glob
+import json
+import argparse
+
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+
+EARTH_RADIUS_KM = 6371.0088
+CHUNK = 2048
+
+
+def unit_vectors(lat, lon):
+    '''Points on the unit sphere for latitudes and longitudes in degrees.'''
+    lat, lon = np.radians(lat), np.radians(lon)
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    '''Great-circle distance in km, broadcasting over its arguments (degrees).'''
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+def km_to_chord(km):
+    return 2 * np.sin(np.minimum(km / EARTH_RADIUS_KM, np.pi) / 2)
+
+
+class GeoIndex:
+
+    def __init__(self, ids, lat, lon, countries=()):
+        self.ids = np.asarray(ids, dtype=str)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.countries = np.asarray(countries if len(countries) else [''] * len(self.ids), dtype=str)
+        self.xyz = unit_vectors(self.lat, self.lon)
+        self.tree = cKDTree(self.xyz) if cKDTree is not None and len(self.ids) else None
+
+        # country code and name (case-folded) -> positions
+        self.by_country = {}
+        for i, names in enumerate(self.countries):
+            for name in filter(None, names.split('|')):
+                self.by_country.setdefault(name.casefold(), []).append(i)
+        self.by_country = {name: np.array(positions) for name, positions in self.by_country.items()}
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_records(cls, records):
+        '''Index organisation records; those without coordinates are left out.'''
+        ids, lat, lon, countries = [], [], [], []
+        for data in records:
+            location = data.get('location') or {}
+            if location.get('lat') is None or location.get('lon') is None:
+                continue
+            ids.append(data.get('id'))
+            lat.append(location['lat'])
+            lon.append(location['lon'])
+            countries.append('|'.join(str(c) for c in location.get('country') or []))
+        return cls(ids, lat, lon, countries)
+
+    @classmethod
+    def from_directory(cls, path='./src-data/organisation/'):
+        def records():
+            for file in sorted(glob.glob(os.path.join(path, '*.json'))):
+                with open(file, 'r', encoding='utf-8') as f:
+                    yield json.load(f)
+        return cls.from_records(records())
+
+    def save(self, path):
+        np.savez_compressed(path, ids=self.ids, lat=self.lat, lon=self.lon, countries=self.countries)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as packed:
+            return cls(packed['ids'], packed['lat'], packed['lon'], packed['countries'])
+
+    def nearest(self, lat, lon, k=5):
+        '''
+        The k nearest organisations to each query point.
+
+        Returns (ids, km). For a single point these have shape (k,); for arrays
+        of n points, (n, k). k is capped at the size of the index.
+        '''
+        single = np.ndim(lat) == 0
+        lat, lon = np.atleast_1d(lat).astype(np.float64), np.atleast_1d(lon).astype(np.float64)
+        k = min(k, len(self))
+
+        if k == 0:
+            positions, km = np.empty((len(lat), 0), dtype=np.intp), np.empty((len(lat), 0))
+        elif self.tree is not None:
+            chord, positions = self.tree.query(unit_vectors(lat, lon), k=k)
+            positions, km = positions.reshape(len(lat), k), chord_to_km(chord.reshape(len(lat), k))
+        else:
+            positions = np.empty((len(lat), k), dtype=np.intp)
+            km = np.empty((len(lat), k))
+            for start in range(0, len(lat), CHUNK):
+                rows = slice(start, start + CHUNK)
+                d = haversine(lat[rows, None], lon[rows, None], self.lat[None, :], self.lon[None, :])
+                part = np.argpartition(d, k - 1, axis=1)[:, :k]
+                order = np.take_along_axis(d, part, axis=1).argsort(axis=1)
+                positions[rows] = np.take_along_axis(part, order, axis=1)
+                km[rows] = np.take_along_axis(d, positions[rows], axis=1)
+
+        ids = self.ids[positions]
+        return (ids[0], km[0]) if single else (ids, km)
+
+    def within(self, lat, lon, radius_km):
+        '''
+        Every organisation within radius_km of each query point, nearest first.
+
+        Returns (ids, km) arrays for a single point, or a list of such pairs
+        for arrays of points.
+        '''
+        single = np.ndim(lat) == 0
+        lat, lon = np.atleast_1d(lat).astype(np.float64), np.atleast_1d(lon).astype(np.float64)
+
+        if self.tree is not None:
+            hits = self.tree.query_ball_point(unit_vectors(lat, lon), r=km_to_chord(radius_km))
+            hits = [np.asarray(h, dtype=np.intp) for h in hits]
+        else:
+            hits = []
+            for start in range(0, len(lat), CHUNK):
+                rows = slice(start, start + CHUNK)
+                d = haversine(lat[rows, None], lon[rows, None], self.lat[None, :], self.lon[None, :])
+                hits += [np.flatnonzero(row <= radius_km) for row in d]
+
+        results = []
+        for i, positions in enumerate(hits):
+            km = haversine(lat[i], lon[i], self.lat[positions], self.lon[positions])
+            order = km.argsort()
+            results.append((self.ids[positions][order], km[order]))
+        return results[0] if single else results
+
+    def country(self, name):
+        '''Ids of the organisations in a country, by ISO code or name.'''
+        return self.ids[self.by_country.get(name.casefold(), np.array([], dtype=np.intp))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the organisation locations")
+    parser.add_argument("--path", default='./src-data/organisation/', help="Organisation directory")
+    parser.add_argument("--index", help="Load a saved .npz index instead of the organisation files")
+    parser.add_argument("--near", nargs=2, type=float, metavar=('LAT', 'LON'), help="Nearest organisations to a point")
+    parser.add_argument("-k", type=int, default=5, help="Number of neighbours for --near")
+    parser.add_argument("--within", nargs=3, type=float, metavar=('LAT', 'LON', 'KM'), help="Organisations within a radius")
+    parser.add_argument("--country", help="Organisations in a country (code or name)")
+    parser.add_argument("--save", help="Write the packed index to this .npz file")
+    args = parser.parse_args()
+
+    index = GeoIndex.load(args.index) if args.index else GeoIndex.from_directory(args.path)
+    print(f"🌍 {len(index)} located organisations ({'KD-tree' if index.tree is not None else 'haversine scan'})")
+
+    if args.near:
+        for id, km in zip(*index.nearest(*args.near, k=args.k)):
+            print(f"{id:30} {km:10.1f} km")
+    if args.within:
+        for id, km in zip(*index.within(*args.within)):
+            print(f"{id:30} {km:10.1f} km")
+    if args.country:
+        print('\n'.join(index.country(args.country)))
+    if args.save:
+        index.save(args.save)
+        print(f"💾 Saved to {args.save}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
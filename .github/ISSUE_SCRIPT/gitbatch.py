@@ -0,0 +1,119 @@
+"""
+Batched git helpers for scripts that touch many files.
+
+last_authors() reads the author of the last commit for every file under a
+directory from a single `git log` call. BatchCommitter queues one commit per
+file (or one commit for a group of files, with add_files) and writes them all
+through one `git fast-import` process, keeping the author of each commit.
+
+Usage:
+    authors = last_authors('./src-data/organisation/')
+    batch = BatchCommitter()
+    batch.add(filepath, authors[os.path.normpath(filepath)], 'Update aer: new ROR data')
+    batch.flush()
+"""
+
+import os
+import subprocess
+from pathlib import Path
+
+
+def _git(*args, input=None):
+    return subprocess.run(['git', *args], input=input, capture_output=True, check=True).stdout
+
+
+def toplevel():
+    return Path(_git('rev-parse', '--show-toplevel').decode().strip())
+
+
+def repo_path(filepath, root=None):
+    '''Path of a file relative to the repository root, as git prints it.'''
+    root = root or toplevel()
+    return Path(os.path.abspath(filepath)).relative_to(root).as_posix()
+
+
+def as_author(author):
+    '''Normalise an author given as a github login or a (name, email) pair.'''
+    if isinstance(author, (tuple, list)):
+        return tuple(author)
+    if isinstance(author, dict):
+        login = author.get('email') or author.get('login') or author['name']
+        return author['name'], login if '@' in login else f"{login}@users.noreply.github.com"
+    return author, f"{author}@users.noreply.github.com"
+
+
+def last_authors(directory):
+    '''
+    Map every file under directory to the (name, email) of its last author.
+
+    Keys are normalised paths relative to the working directory, so look
+    files up with os.path.normpath(filepath).
+    '''
+    out = _git('-c', 'core.quotePath=false', 'log', '--format=%x00%an%x00%ae', '--name-only', '--relative', '--', str(directory))
+
+    authors = {}
+    author = None
+    for line in out.decode('utf-8', 'replace').splitlines():
+        if line.startswith('\0'):
+            author = tuple(line[1:].split('\0'))
+        elif line and line not in authors:
+            authors[line] = author
+    return authors
+
+
+class BatchCommitter:
+
+    def __init__(self):
+        self.pending = []
+
+    def __len__(self):
+        return len(self.pending)
+
+    def add(self, filepath, author, message):
+        '''Queue a commit of the current content of filepath.'''
+        self.add_files([filepath], author, message)
+
+    def add_files(self, filepaths, author, message):
+        '''Queue a single commit of the current content of every file in filepaths.'''
+        self.pending.append((list(filepaths), as_author(author), message))
+
+    def flush(self):
+        '''
+        Write the queued commits on top of the current branch in one fast-import run.
+
+        The index is reset to the new HEAD afterwards; the working tree already
+        holds the committed content. Returns the number of commits written.
+        '''
+        if not self.pending:
+            return 0
+
+        root = toplevel()
+        ref = _git('symbolic-ref', 'HEAD').decode().strip()
+        parent = _git('rev-parse', 'HEAD').decode().strip()
+        committer = _git('var', 'GIT_COMMITTER_IDENT').decode().strip()
+        timestamp = committer.rsplit(' ', 2)[1:]
+
+        stream = []
+        for i, (filepaths, (name, email), message) in enumerate(self.pending):
+            message = message.encode()
+
+            stream.append(f"commit {ref}\n".encode())
+            stream.append(f"author {name} <{email}> {' '.join(timestamp)}\n".encode())
+            stream.append(f"committer {committer}\n".encode())
+            stream.append(f"data {len(message)}\n".encode() + message + b"\n")
+            if i == 0:
+                stream.append(f"from {parent}\n".encode())
+            for filepath in filepaths:
+                with open(filepath, 'rb') as f:
+                    content = f.read()
+                stream.append(f"M 100644 inline {repo_path(filepath, root)}\n".encode())
+                stream.append(f"data {len(content)}\n".encode() + content + b"\n")
+            stream.append(b"\n")
+        stream.append(b"done\n")
+
+        _git('fast-import', '--quiet', '--done', input=b''.join(stream))
+        _git('reset', '--quiet')
+
+        count = len(self.pending)
+        self.pending = []
+        return count
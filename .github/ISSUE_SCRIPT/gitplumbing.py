@@ -0,0 +1,142 @@
+"""
+Commit files to a branch through git plumbing.
+
+The issue scripts only ever add a file or two on top of main. Instead of
+creating a branch, checking it out and writing the files into the worktree
+first, the blobs, trees and commit are written straight into the object
+database and the branch ref is pointed at the new commit. The branch is only
+checked out afterwards (switch), because git.newpull opens the pull request
+from HEAD; by then it differs from main by the committed files alone.
+
+push replaces a branch left by an earlier run of the same issue, but never
+one that someone else has pushed to since: it fails instead, and the lease
+makes it fail too if the branch moves while the push is under way.
+
+Usage:
+    if not exists('main', 'src-data/activity/cmip.json'):
+        commit_files('new_activity_cmip', {'src-data/activity/cmip.json': content},
+                     'New entry CMIP in activity files.', author, base='main')
+        push('new_activity_cmip')
+        switch('new_activity_cmip')    # git.newpull opens the PR from HEAD
+"""
+
+import os
+import subprocess
+
+from gitbatch import as_author
+
+
+def _git(*args, input=None, env=None):
+    return subprocess.run(
+        ['git', *args], input=input, capture_output=True, check=True,
+        env={**os.environ, **(env or {})},
+    ).stdout
+
+
+def exists(ref, path):
+    '''Does path exist in the tree of ref.'''
+    path = os.path.normpath(path)
+    return subprocess.run(['git', 'cat-file', '-e', f"{ref}:{path}"], capture_output=True).returncode == 0
+
+
+def write_blob(content):
+    if isinstance(content, str):
+        content = content.encode()
+    return _git('hash-object', '-w', '--stdin', input=content).decode().strip()
+
+
+def _tree_entries(tree):
+    '''Entries of a tree as {name: (mode, type, sha)}.'''
+    if tree is None:
+        return {}
+    entries = {}
+    for line in _git('ls-tree', '-z', tree).split(b'\0'):
+        if line:
+            meta, name = line.split(b'\t', 1)
+            mode, kind, sha = meta.decode().split()
+            entries[name] = (mode, kind, sha)
+    return entries
+
+
+def _mktree(entries):
+    listing = b''.join(
+        f"{mode} {kind} {sha}\t".encode() + name + b'\0'
+        for name, (mode, kind, sha) in sorted(entries.items())
+    )
+    return _git('mktree', '-z', input=listing).decode().strip()
+
+
+def put_path(tree, parts, blob):
+    '''Return a new tree id with blob stored at parts below tree (None for an empty tree).'''
+    entries = _tree_entries(tree)
+    name = parts[0].encode()
+
+    if len(parts) == 1:
+        entries[name] = ('100644', 'blob', blob)
+    else:
+        subtree = entries[name][2] if name in entries and entries[name][1] == 'tree' else None
+        entries[name] = ('040000', 'tree', put_path(subtree, parts[1:], blob))
+
+    return _mktree(entries)
+
+
+def commit_files(branch, files, message, author, base='main'):
+    '''
+    Commit files ({path: content}) on top of base and point branch at the result.
+
+    The worktree, index and HEAD are left untouched. Returns the new commit id.
+    '''
+    parent = _git('rev-parse', '--verify', f"{base}^{{commit}}").decode().strip()
+    tree = _git('rev-parse', f"{parent}^{{tree}}").decode().strip()
+
+    for path, content in files.items():
+        parts = os.path.normpath(path).split(os.sep)
+        tree = put_path(tree, parts, write_blob(content))
+
+    name, email = as_author(author)
+    commit = _git(
+        'commit-tree', tree, '-p', parent, '-m', message,
+        env={'GIT_AUTHOR_NAME': name, 'GIT_AUTHOR_EMAIL': email},
+    ).decode().strip()
+
+    _git('update-ref', f"refs/heads/{branch}", commit)
+    return commit
+
+
+def remote_tip(branch, remote='origin'):
+    '''The commit branch points at on remote, or None if it has no such branch.'''
+    out = _git('ls-remote', remote, f"refs/heads/{branch}").split()
+    return out[0].decode() if out else None
+
+
+def foreign_commits(tip, base='main'):
+    '''Commits between base and tip made by another committer than this one.'''
+    ident = _git('var', 'GIT_COMMITTER_IDENT').decode()
+    email = ident[ident.index('<') + 1:ident.index('>')]
+    log = _git('log', '--format=%H %ce', f"{base}..{tip}").decode().split('\n')
+    return [line.split()[0] for line in log if line and line.split()[1] != email]
+
+
+def push(branch, remote='origin', base='main'):
+    '''
+    Push branch to remote, replacing the remote branch only if every commit it
+    has on top of base was made by this committer (an earlier run of the issue).
+
+    Raises RuntimeError if someone else has pushed to it, rather than
+    overwriting their changes.
+    '''
+    expected = remote_tip(branch, remote)
+    if expected:
+        _git('fetch', '--quiet', remote, f"refs/heads/{branch}")
+        others = foreign_commits(expected, base)
+        if others:
+            raise RuntimeError(f"{remote}/{branch} has commits by others ({', '.join(c[:8] for c in others)}), "
+                               "not overwriting it; merge or delete the branch and run again")
+    # an empty lease means the branch must not exist yet
+    _git('push', f"--force-with-lease=refs/heads/{branch}:{expected or ''}", remote,
+         f"refs/heads/{branch}:refs/heads/{branch}")
+
+
+def switch(branch):
+    '''Check out branch. It differs from main by the committed files only, so this touches just those.'''
+    _git('switch', '--quiet', branch)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Regenerate only the content summaries whose source files changed.
+
+Each summary written by this script carries a `source_hash` in its Header: a
+sha256 over the paths and contents of the src-data files it is built from. On
+the next run the hash is recomputed per category, and only categories whose
+hash differs are handed to the summary generator (cmipld's generate_summary),
+one generator script at a time. Unchanged summaries are copied to the output
+directory byte for byte so they produce no git churn. A category whose source
+directory is gone gets no summary, so the output directory holds exactly the
+summaries that should exist.
+
+Usage:
+    python incremental_summaries.py --scripts .github/GENERATE_SUMMARIES/ \\
+        --summaries ./content_summaries/ --out .summaries/ --report summaries-report.json
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+
+PREFIX = 'wcrp-universe_'
+
+# summaries built from a directory other than their own name
+SOURCE_DIRS = {
+    'institution': ['organisation'],
+    'consortium': ['organisation'],
+}
+
+
+def source_hash(root, category):
+    '''sha256 over the relative paths and contents of the files a summary is built from.'''
+    digest = hashlib.sha256()
+    for directory in SOURCE_DIRS.get(category, [category]):
+        for file in sorted(glob.glob(os.path.join(root, directory, '*'))):
+            name = os.path.basename(file)
+            if not os.path.isfile(file) or name.startswith('.') or name.startswith('graph.'):
+                continue
+            digest.update(f"{directory}/{name}\0".encode())
+            with open(file, 'rb') as f:
+                digest.update(f.read())
+            digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def stored_hash(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)['Header'].get('source_hash')
+    except (FileNotFoundError, KeyError, ValueError):
+        return None
+
+
+def stamp(path, digest):
+    '''Record the source hash in the Header of a freshly generated summary.'''
+    with open(path, 'r', encoding='utf-8') as f:
+        summary = json.load(f)
+    summary['Header']['source_hash'] = digest
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=4, ensure_ascii=False)
+
+
+def generate(script, out, command):
+    '''Run the generator on a directory holding only this script.'''
+    with tempfile.TemporaryDirectory() as staging:
+        shutil.copy(script, staging)
+        subprocess.run([*command.split(), staging], check=True)
+
+    name = PREFIX + Path(script).stem + '.json'
+    generated = Path('.summaries') / name
+    if generated.resolve() != (Path(out) / name).resolve():
+        shutil.move(generated, Path(out) / name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate content summaries whose sources changed")
+    parser.add_argument("--src", default='./', help="Root of the src-data checkout")
+    parser.add_argument("--scripts", default='.github/GENERATE_SUMMARIES/', help="Directory of summary generator scripts")
+    parser.add_argument("--summaries", default='./content_summaries/', help="Directory of the current summaries")
+    parser.add_argument("--out", default='.summaries/', help="Directory to write the summaries to")
+    parser.add_argument("--command", default='generate_summary', help="Summary generator command")
+    parser.add_argument("--report", help="Write a JSON report of what was regenerated to this path")
+    parser.add_argument("--force", action="store_true", help="Regenerate every summary")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    report = {}
+
+    for script in sorted(glob.glob(os.path.join(args.scripts, '*.py'))):
+        category = Path(script).stem
+        name = PREFIX + category + '.json'
+        current = os.path.join(args.summaries, name)
+        target = os.path.join(args.out, name)
+
+        start = time.perf_counter()
+        if not any(os.path.isdir(os.path.join(args.src, d)) for d in SOURCE_DIRS.get(category, [category])):
+            # nothing to summarise any more: the summary is left out, so it is deleted
+            report[category] = {'status': 'removed', 'source_hash': None, 'seconds': 0.0}
+            print(f"🗑️  {category}: removed (no source directory)")
+            continue
+        digest = source_hash(args.src, category)
+
+        if not args.force and stored_hash(current) == digest:
+            if os.path.abspath(current) != os.path.abspath(target):
+                shutil.copyfile(current, target)
+            status = 'unchanged'
+        else:
+            try:
+                generate(script, args.out, args.command)
+                stamp(target, digest)
+                status = 'regenerated'
+            except (subprocess.CalledProcessError, FileNotFoundError) as err:
+                print(f"❌ Could not generate {name}: {err}")
+                status = 'failed'
+                # keep the current summary rather than have it deleted
+                if os.path.exists(current) and os.path.abspath(current) != os.path.abspath(target):
+                    shutil.copyfile(current, target)
+
+        report[category] = {
+            'status': status,
+            'source_hash': digest,
+            'seconds': round(time.perf_counter() - start, 3),
+        }
+        print(f"{'✅' if status == 'regenerated' else 'ℹ️ ' if status == 'unchanged' else '❌'} {category}: {status} ({report[category]['seconds']}s)")
+
+    regenerated = sum(r['status'] == 'regenerated' for r in report.values())
+    print(f"📊 Regenerated {regenerated} of {len(report)} summaries")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    return 1 if any(r['status'] == 'failed' for r in report.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,11 +3,11 @@ from pathlib import Path
 # set the path to read update_ror. 
 sys.path.append(str(Path(__file__).parent))
 
-import update_ror
+import similarity_index
+import universe_store
+import gitplumbing
+import timing
 import json,os
-from cmipld.utils import git
-from  cmipld.tests import jsonld as tests
-from cmipld.tests.jsonld.organisation import ror
 
 
 path = './src-data/organisation/'
@@ -29,8 +29,53 @@ def similarity(name1, name2):
 
 
 
+def organisation_data(issue, fetched=None):
+    '''
+    The organisation record an issue describes.
+
+    Built from ROR unless the ror is pending; fetched is an institution record
+    already retrieved with update_ror.get_institutions.
+    '''
+    acronym = issue['acronym']
+    if issue['ror'] != 'pending':
+        if fetched is not None:
+            return fetched
+        import update_ror
+        with timing.span('update_ror.get_institution'):
+            return update_ror.get_institution(issue['ror'], acronym)
+
+    return {
+                "id": f"{acronym.lower()}",
+                "type": ['wcrp:organisation',f'wcrp:{issue['issue-type']}','universal'],
+                "validation-key": acronym,    
+            }
+
+
+def name_warnings(issue, data, store):
+    '''Warnings about the acronym and full name of a new organisation, as markdown.'''
+    warnings = []
+    if store.acronym_used(issue['acronym']):
+        warnings.append(f"*Warning:* \n The acronym {issue['acronym']} is already used by an existing organisation.")
+
+    if 'ui-label' in data and issue.get('full-name-of-the-organisation'):
+        ranking = similarity(issue['full-name-of-the-organisation'], data['ui-label'])
+        if ranking < 80:
+            warnings.append(f"*Warning:* \n The similarity between the full name ({issue['full-name-of-the-organisation']}) of the organisation and the ui-label ({data['ui-label']}) is {int(ranking)}%")
+    return warnings
+
+
+def author_of(issue, packet):
+    '''The submitter of an issue: the form's submitter field, the packet author, or OVERRIDE_AUTHOR.'''
+    # If there's a specific submitter field in the issue form, use that instead
+    if 'submitter' in issue and issue['submitter']:
+        return issue['submitter']
+    # Get the author from the packet (GitHub issue submitter)
+    return packet.get('author') or os.environ.get('OVERRIDE_AUTHOR', 'unknown')
+
+
 def run(issue,packet):
     # print('issue',issue)
+    from cmipld.utils import git
     
     git.update_summary(f"### Issue content\n ```json\n{json.dumps(issue,indent=4)}\n```")
     
@@ -38,101 +83,74 @@ def run(issue,packet):
     acronym = issue['acronym']
     id = acronym.lower()
     
+    # the acronym should not already identify another organisation
+    with timing.span('store.load'):
+        store = universe_store.Store.from_checkout('./src-data/', categories=['organisation'])
+    
 
-    # update the issue title and create an issue branch
+    # update the issue title, the branch is created when the file is committed
     title = f'{issue["issue-type"].capitalize()}_{acronym}'
     git.update_issue_title(title)
-    git.newbranch(title)
     
+    # the pydantic models are only built once an issue is being checked
+    from cmipld.tests import jsonld as tests
     acronym_test = tests.field_test(tests.components.id.id_field)
     ror_test = tests.field_test(tests.organisation.ror.ror_field)
     # testclass = tests.multi_field_test([tests.organisation.ror.ror_field,tests.components.id.id_field])
     
-    if ror != 'pending':
-    
+    with timing.span('pydantic.checks'):
         tests.run_checks(acronym_test,{"id" : id})
-        tests.run_checks(ror_test,{"ror" : ror})
-        
+        if ror != 'pending':
+            tests.run_checks(ror_test,{"ror" : ror})
 
-        data = update_ror.get_institution(ror, acronym)
+    data = organisation_data(issue)
 
+    if ror != 'pending':
         ranking = similarity(issue['full-name-of-the-organisation'], data['ui-label'])
-        
         git.update_summary(f"### Similarity\nThe similarity between the full name ({issue['full-name-of-the-organisation']}) of the organisation and the ui-label ({data['ui-label']}) is {ranking}%")
-        
-        
-        if ranking < 80:
-            git.update_issue(f"*Warning:* \n The similarity between the full name ({issue['full-name-of-the-organisation']}) of the organisation and the ui-label ({data['ui-label']}) is {int(ranking)}%")
-            
-    else:
 
-        tests.run_checks(acronym_test,{"id" : id})
-        
-        data = {
-                    "id": f"{id}",
-                    "type": ['wcrp:organisation',f'wcrp:{issue['issue-type']}','universal'],
-                    "validation-key": acronym,    
-                }        
+    for warning in name_warnings(issue, data, store):
+        git.update_issue(warning)
 
     git.update_summary(f"### Data content\n ```json\n{json.dumps(data,indent=4)}\n```")
     
+    # check for organisations we already have under a similar name
+    names = [issue.get('full-name-of-the-organisation'), acronym, data.get('ui-label')]
+    with timing.span('similarity.index'):
+        index = similarity_index.TrigramIndex.from_store(store)
+    git.update_summary(index.report(*filter(None, names), exclude={id}))
+    
     
     
     
     
     
     
-    # write the data to a file
-
     outfile = path+id+'.json'
-    print('writing to',outfile)
-    json.dump(data,open(outfile,'w'),indent=4)
-    print('done')
-
-
-    print(os.popen(f"less {outfile}").read())
     
     # git branch commit and push function
     
     # if we are happy, and have gotten this far: 
     
-# <<<<<<< update-organizations-from-ror
-    # Get the author from the packet (GitHub issue submitter)
-    # This is the username of the person who submitted the issue
-    author = packet.get('author')
-# =======
-#     if 'submitter' in issue: 
-#         # override the current author
-#         os.environ['ISSUE_SUBMITTER'] = issue['submitter']
-# >>>>>>> main
-    
-    # If there's a specific submitter field in the issue form, use that instead
-    if 'submitter' in issue and issue['submitter']:
-        author = issue['submitter']
-    
-    # Fallback to environment variable if neither is available
-    if not author:
-        author = os.environ.get('OVERRIDE_AUTHOR', 'unknown')
+    author = author_of(issue, packet)
     
-# <<<<<<< update-organizations-from-ror
     # Set the environment variable for other git operations that might need it
-    if author:
-        os.environ['OVERRIDE_AUTHOR'] = author
-# =======
-#     # # add files
-#     # git.addall()
-
-#     # git.addfile(outfile)
-#     # commmit them
-
-#     author = os.environ.get('ISSUE_SUBMITTER')
-# >>>>>>> main
+    os.environ['OVERRIDE_AUTHOR'] = author
     
-    # Commit the file with the correct author
-    git.commit_one(outfile, author, comment=f'New entry {acronym} in {issue["issue-type"]} files.', branch=title)
+    # Commit the file with the correct author, straight into the object database
+    print('writing to',outfile)
+    with timing.span('git.commit'):
+        gitplumbing.commit_files(title, {outfile: json.dumps(data, indent=4)}, f'New entry {acronym} in {issue["issue-type"]} files.', author, base='main')
+    with timing.span('git.push'):
+        gitplumbing.push(title)
+    print('done')
     
     # Create pull request with the same author
-    git.newpull(title, author, json.dumps(issue, indent=4), title, os.environ['ISSUE_NUMBER'])
+    with timing.span('git.newpull'):
+        gitplumbing.switch(title)    # newpull opens the PR from the checked-out branch
+        git.newpull(title, author, json.dumps(issue, indent=4), title, os.environ['ISSUE_NUMBER'])
+    
+    timing.report(git.update_summary)
     
     
         
@@ -0,0 +1,127 @@
+"""
+Token-bucket rate governor shared by the threads of a RORClient.
+
+Every request takes a token from one bucket refilled at `rate` tokens per
+second, so however many workers run, the API sees at most `rate` requests per
+second after an initial burst. A 429 or 5xx response pauses every worker (for
+the Retry-After the server asked for, or an exponential backoff with jitter)
+and halves the rate; each success wins back a small step of it, up to the
+configured rate.
+
+Environment:
+    ROR_RATE   requests per second (default 6, the ROR limit being 2000 per
+               5 minutes), or 'off' to disable the governor
+    ROR_BURST  size of the bucket (default: one second of requests)
+
+Usage:
+    governor = RateGovernor.from_env()
+    governor.acquire()                     # before each request
+    governor.success()                     # after a good response
+    governor.backoff(attempt, retry_after) # after a 429 or 5xx
+"""
+
+import os
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+
+DEFAULT_RATE = 6.0
+MAX_BACKOFF = 300.0
+
+
+def retry_after(value):
+    '''Seconds to wait from a Retry-After header (seconds or an HTTP date), or None.'''
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RateGovernor:
+
+    def __init__(self, rate=DEFAULT_RATE, burst=None, min_rate=None, base_delay=1.0, max_backoff=MAX_BACKOFF):
+        self.max_rate = self.rate = float(rate)
+        self.min_rate = min_rate or self.max_rate / 16
+        self.capacity = float(burst or max(1.0, self.max_rate))
+        self.base_delay = base_delay
+        self.max_backoff = max_backoff
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.stats = {'requests': 0, 'throttled': 0, 'waited': 0.0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        '''The governor configured by ROR_RATE / ROR_BURST, or None if ROR_RATE is off.'''
+        rate = os.environ.get('ROR_RATE', str(DEFAULT_RATE))
+        if rate.lower() == 'off':
+            return None
+        burst = os.environ.get('ROR_BURST')
+        return cls(float(rate), burst=float(burst) if burst else None)
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        '''Block until a request may be made.'''
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.paused_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        self.stats['requests'] += 1
+                        self.stats['waited'] += waited
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def success(self):
+        '''Additive increase: win back a twentieth of the configured rate.'''
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def backoff(self, attempt, retry_after=None):
+        '''
+        Pause every worker after a 429 or 5xx and halve the rate.
+
+        attempt counts the retries of this request from 0. Returns the pause in
+        seconds.
+        '''
+        if retry_after is None:
+            delay = min(self.max_backoff, self.base_delay * 2 ** attempt)
+            delay *= 0.5 + random.random() / 2
+        else:
+            delay = min(self.max_backoff, retry_after)
+
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.paused_until = max(self.paused_until, now + delay)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0.0
+            self.stats['throttled'] += 1
+        return delay
+
+    def report(self):
+        s = self.stats
+        return (f"ROR rate governor: {s['requests']} requests, {s['throttled']} throttled, "
+                f"{s['waited']:.1f} worker-seconds waiting, rate now {self.rate:.2f}/s")
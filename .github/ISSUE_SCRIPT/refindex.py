@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Cross-category reference index of the universe.
+
+One pass over src-data records, for every term, the nodes it defines and the
+references it makes:
+
+    - a term file defines `<category>/<id>`; embedded objects with an id
+      define theirs when it is in a category that has no term files (e.g.
+      `universal:location/<ror>` inside an organisation). Several files may
+      define the same embedded node, which stays defined until the last of
+      them is gone. An embedded object whose id is in a category of term
+      files (a consortium member `{"id": "universal:organisation/ipsl"}`)
+      is a reference to that term, not a definition
+    - a string of the form `[prefix:]<category>/<id>` is a reference, when
+      prefix is the repository prefix (or absent) and category is a known
+      category (a directory, or one defined by embedded nodes)
+    - `type` values (`wcrp:organisation`, `universal`) are indexed per node
+      and in reverse, so referrers('wcrp:organisation') lists the terms of a
+      type; they name classes and prefixes rather than terms, so there is no
+      file for them to resolve to and they are never reported as dangling
+
+forward[node] holds what a node points at and reverse[target] what points at
+it, so "what references X" is a dictionary hit, and the dangling references
+of the whole universe are found in one pass over reverse. update(paths)
+re-reads only the given files (deleted files drop out). With a cache file,
+the index is saved with the size and mtime of every file and only files that
+changed since are re-read on the next run.
+
+Usage:
+    index = ReferenceIndex.from_directory('./src-data/')
+    index.referrers('organisation/mohc')
+    index.referrers('wcrp:institution')   # terms of a type
+    index.dangling()
+    index.check(data, 'organisation')     # references of a new record that do not resolve
+
+    python refindex.py --check [--cache .refindex.json]
+    python refindex.py --referrers organisation/mohc
+    python refindex.py --impact HEAD~1    # terms referring to ids changed or deleted since a commit
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+from collections import defaultdict
+
+
+SKIP = ['graph.', '_context_']
+PREFIX = 'universal'
+REFERENCE = re.compile(r'^(?:([\w-]+):)?([\w-]+)/([\w.-]+)$')
+
+
+def node_key(category, id):
+    return f"{category}/{id}".lower()
+
+
+class ReferenceIndex:
+
+    def __init__(self, src='./src-data/', prefix=PREFIX):
+        self.src = src
+        self.prefix = prefix
+        self.categories = set()
+        # categories of term files: an embedded id in one of these refers to a term
+        self.directories = {entry.name for entry in os.scandir(src)
+                            if entry.is_dir() and not entry.name.startswith('.')} if os.path.isdir(src) else set()
+        self.forward = {}                  # node -> {target: [fields]}
+        self.reverse = defaultdict(set)    # target -> nodes
+        self.defines = {}                  # path -> nodes defined in the file
+        self.defined = defaultdict(set)    # node -> paths defining it
+        self.types = {}                    # node -> types
+        self.typed = defaultdict(set)      # type -> nodes
+        self.stats = {}                    # path -> (mtime_ns, size)
+
+    def __len__(self):
+        return len(self.defined)
+
+    # -- parsing -----------------------------------------------------------
+
+    def parse_reference(self, value):
+        '''The node key a string refers to, or None if it is not a local reference.'''
+        match = REFERENCE.match(value)
+        if not match:
+            return None
+        prefix, category, id = match.groups()
+        if prefix not in (None, self.prefix):
+            return None
+        return node_key(category, id)
+
+    def scan(self, category, data):
+        '''
+        The nodes a term defines and the references it makes.
+
+        Returns (defined keys, {target: [fields]}, types).
+        '''
+        own = node_key(category, data.get('id', ''))
+        defined, refs = [own], defaultdict(list)
+
+        def walk(value, field):
+            if isinstance(value, dict):
+                for key in ('id', '@id'):
+                    if isinstance(value.get(key), str):
+                        target = self.parse_reference(value[key])
+                        if not target or target == own:
+                            continue
+                        if target.split('/', 1)[0] in self.directories:
+                            refs[target].append(field)
+                        else:
+                            defined.append(target)
+                for key, item in value.items():
+                    if key not in ('id', '@id', 'type', '@type', '@context'):
+                        walk(item, f"{field}.{key}" if field else key)
+            elif isinstance(value, list):
+                for item in value:
+                    walk(item, field)
+            elif isinstance(value, str):
+                target = self.parse_reference(value)
+                if target and target != own:
+                    refs[target].append(field)
+
+        walk(data, '')
+        types = data.get('type', [])
+        return defined, dict(refs), [types] if isinstance(types, str) else list(types)
+
+    # -- building ----------------------------------------------------------
+
+    def files(self):
+        for entry in os.scandir(self.src):
+            if entry.is_dir() and not entry.name.startswith('.'):
+                for file in os.scandir(entry.path):
+                    if file.name.endswith('.json') and not any(skip in file.name for skip in SKIP):
+                        yield entry.name, os.path.normpath(file.path)
+
+    def remove(self, path):
+        for node in self.defines.pop(path, ()):
+            paths = self.defined.get(node)
+            if paths is not None:
+                paths.discard(path)
+                if not paths:
+                    del self.defined[node]
+            for target in self.forward.pop(node, {}):
+                referrers = self.reverse.get(target)
+                if referrers is not None:
+                    referrers.discard(node)
+                    if not referrers:
+                        del self.reverse[target]
+            self.untype(node)
+        self.stats.pop(path, None)
+
+    def untype(self, node):
+        for type in self.types.pop(node, ()):
+            nodes = self.typed.get(type)
+            if nodes is not None:
+                nodes.discard(node)
+                if not nodes:
+                    del self.typed[type]
+
+    def type(self, node, types):
+        self.types[node] = types
+        for type in types:
+            self.typed[type].add(node)
+
+    def add(self, category, data, path):
+        '''Index one term stored at path (replacing what path held before).'''
+        self.remove(path)
+        self.directories.add(category)
+        defined, refs, types = self.scan(category, data)
+        own = defined[0]
+
+        self.categories.update(node.split('/', 1)[0] for node in defined)
+        self.defines[path] = defined
+        for node in defined:
+            self.defined[node].add(path)
+        self.forward[own] = refs
+        self.type(own, types)
+        for target in refs:
+            self.reverse[target].add(own)
+
+    def read(self, category, path):
+        stat = os.stat(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            self.add(category, data, path)
+        self.stats[path] = (stat.st_mtime_ns, stat.st_size)
+
+    def update(self, paths):
+        '''Re-index the given term files; files that no longer exist are removed.'''
+        for path in map(os.path.normpath, paths):
+            if os.path.exists(path):
+                self.read(os.path.basename(os.path.dirname(path)), path)
+            else:
+                self.remove(path)
+
+    def refresh(self):
+        '''Re-read the files whose size or mtime changed, and drop deleted ones. Returns the paths touched.'''
+        seen, touched = set(), []
+        for category, path in self.files():
+            seen.add(path)
+            stat = os.stat(path)
+            if self.stats.get(path) != (stat.st_mtime_ns, stat.st_size):
+                self.read(category, path)
+                touched.append(path)
+        for path in set(self.defines) - seen:
+            self.remove(path)
+            touched.append(path)
+        return touched
+
+    @classmethod
+    def from_directory(cls, src='./src-data/', prefix=PREFIX, cache=None):
+        '''Build the index, reusing a cache file when given (and saving it back).'''
+        index = cls.load(cache, src, prefix) if cache and os.path.exists(cache) else cls(src, prefix)
+        touched = index.refresh()
+        if cache and touched:
+            index.save(cache)
+        return index
+
+    # -- persistence -------------------------------------------------------
+
+    def save(self, path):
+        state = {
+            'prefix': self.prefix,
+            'files': {
+                file: [self.stats[file], nodes, self.forward.get(nodes[0], {}), self.types.get(nodes[0], [])]
+                for file, nodes in self.defines.items()
+            },
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+
+    @classmethod
+    def load(cls, path, src='./src-data/', prefix=PREFIX):
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        index = cls(src, prefix)
+        if state.get('prefix') != prefix:
+            return index
+        for file, (stat, nodes, refs, types) in state['files'].items():
+            index.stats[file] = tuple(stat)
+            index.defines[file] = nodes
+            index.categories.update(node.split('/', 1)[0] for node in nodes)
+            for node in nodes:
+                index.defined[node].add(file)
+            index.forward[nodes[0]] = refs
+            index.type(nodes[0], types)
+            for target in refs:
+                index.reverse[target].add(nodes[0])
+        return index
+
+    # -- queries -----------------------------------------------------------
+
+    def referrers(self, key):
+        '''The nodes that reference key (`category/id`), or that have key as a type.'''
+        if key in self.typed:
+            return self.typed[key]
+        return self.reverse.get(key.lower(), set())
+
+    def references(self, key):
+        '''What key references, as {target: [fields]}.'''
+        return self.forward.get(key.lower(), {})
+
+    def resolves(self, target):
+        # references into categories this repository does not hold are left alone
+        return target in self.defined or target.split('/', 1)[0] not in self.categories
+
+    def dangling(self):
+        '''Every reference that does not resolve, as {target: referrers}.'''
+        return {target: nodes for target, nodes in self.reverse.items() if not self.resolves(target)}
+
+    def check(self, data, category):
+        '''References of a record (not yet in the index) that do not resolve, as {target: [fields]}.'''
+        defined, refs, _ = self.scan(category, data)
+        return {target: fields for target, fields in refs.items()
+                if target not in defined and not self.resolves(target)}
+
+    def impact(self, keys):
+        '''The nodes outside keys that reference any of keys.'''
+        keys = {key.lower() for key in keys}
+        return {key: self.referrers(key) - keys for key in keys if self.referrers(key) - keys}
+
+
+def changed_terms(src, since):
+    '''The `category/id` keys of the term files changed or deleted since a commit.'''
+    out = subprocess.run(
+        ['git', '-c', 'core.quotePath=false', 'diff', '--name-only', '--relative', since, '--', src],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    keys = []
+    for path in out.splitlines():
+        if path.endswith('.json') and not any(skip in path for skip in SKIP):
+            category, name = os.path.normpath(path).split(os.sep)[-2:]
+            keys.append(node_key(category, name[:-len('.json')]))
+    return keys
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index the references between terms of the universe")
+    parser.add_argument("--src", default='./src-data/', help="Directory holding the category directories")
+    parser.add_argument("--prefix", default=PREFIX, help="Prefix of this repository's terms")
+    parser.add_argument("--cache", help="Index file reused and refreshed between runs")
+    parser.add_argument("--check", action="store_true", help="Fail if any reference does not resolve")
+    parser.add_argument("--referrers", nargs='+', metavar="KEY", help="Terms referencing category/id, or of a type")
+    parser.add_argument("--impact", metavar="COMMIT", help="Terms referencing ids changed or deleted since a commit")
+    args = parser.parse_args()
+
+    index = ReferenceIndex.from_directory(args.src, args.prefix, cache=args.cache)
+    edges = sum(len(refs) for refs in index.forward.values())
+    print(f"🔗 {len(index)} nodes, {edges} references, {len(index.categories)} categories")
+
+    for key in args.referrers or []:
+        print(f"#### {key}")
+        for node in sorted(index.referrers(key)):
+            print(f"   {node:50} {', '.join(index.references(node).get(key.lower(), ['type']))}")
+
+    if args.impact:
+        changed = changed_terms(args.src, args.impact)
+        print(f"📝 {len(changed)} terms changed since {args.impact}")
+        for key, nodes in sorted(index.impact(changed).items()):
+            state = '' if key in index.defined else ' (deleted)'
+            print(f"⚠️  {key}{state} is referenced by {', '.join(sorted(nodes))}")
+
+    dangling = index.dangling()
+    for target, nodes in sorted(dangling.items()):
+        print(f"❌ {target} is referenced by {', '.join(sorted(nodes))} but not defined")
+    print(f"{'❌' if dangling else '✅'} {len(dangling)} dangling references")
+
+    return 1 if args.check and dangling else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
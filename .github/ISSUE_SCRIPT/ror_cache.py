@@ -0,0 +1,137 @@
+"""
+Persistent on-disk cache of ROR API responses.
+
+Responses are stored in a small SQLite database keyed by ROR id together with
+their ETag/Last-Modified validators, so stale entries can be revalidated with a
+conditional request instead of a full download. The total size of the stored
+payloads is bounded and the least recently used entries are evicted first.
+
+Environment:
+    ROR_CACHE         path of the database, or 'off' to disable caching
+    ROR_CACHE_TTL     seconds an entry is served without revalidation
+    ROR_CACHE_MAX_MB  size bound of the cached payloads
+    ROR_OFFLINE       1/true/yes/on to only serve from the cache (0/false/no/off or unset: online)
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from collections import Counter
+
+
+DEFAULT_PATH = '~/.cache/wcrp-universe/ror.sqlite'
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_MB = 256
+
+
+def env_flag(name):
+    '''A boolean environment variable; anything but the usual spellings is an error.'''
+    value = os.environ.get(name, '').strip().lower()
+    if value in ('', '0', 'false', 'no', 'off'):
+        return False
+    if value in ('1', 'true', 'yes', 'on'):
+        return True
+    raise ValueError(f"{name}={os.environ[name]!r} is not a boolean (use 1/0, true/false, yes/no or on/off)")
+
+
+class RORCache:
+
+    def __init__(self, path=DEFAULT_PATH, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_MB * 2**20):
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                ror TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched REAL NOT NULL,
+                accessed REAL NOT NULL,
+                size INTEGER NOT NULL
+            )''')
+        self._db.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+
+    @classmethod
+    def from_env(cls):
+        '''Build the cache described by the ROR_CACHE* variables, or None if disabled.'''
+        path = os.environ.get('ROR_CACHE', DEFAULT_PATH)
+        if path.lower() == 'off':
+            return None
+        return cls(
+            path,
+            ttl=float(os.environ.get('ROR_CACHE_TTL', DEFAULT_TTL)),
+            max_bytes=int(float(os.environ.get('ROR_CACHE_MAX_MB', DEFAULT_MAX_MB)) * 2**20),
+        )
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def get(self, ror):
+        '''
+        Return the cached entry for a ROR id as a dict, or None.
+
+        The entry carries a 'fresh' flag telling whether it is still within the TTL.
+        '''
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                'SELECT body, etag, last_modified, fetched FROM responses WHERE ror = ?', (ror,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute('UPDATE responses SET accessed = ? WHERE ror = ?', (now, ror))
+
+        body, etag, last_modified, fetched = row
+        return {
+            'body': body,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fresh': now - fetched < self.ttl,
+        }
+
+    def put(self, ror, body, etag=None, last_modified=None):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (ror, body, etag, last_modified, now, now, len(body))
+            )
+            self._evict()
+
+    def touch(self, ror):
+        '''Mark an entry as revalidated, restarting its TTL.'''
+        now = time.time()
+        with self._lock:
+            self._db.execute('UPDATE responses SET fetched = ?, accessed = ? WHERE ror = ?', (now, now, ror))
+
+    def _evict(self):
+        '''Drop least recently used entries until the payloads fit in max_bytes.'''
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        excess = total - self.max_bytes
+        victims = []
+        for ror, size in self._db.execute('SELECT ror, size FROM responses ORDER BY accessed'):
+            victims.append((ror,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._db.executemany('DELETE FROM responses WHERE ror = ?', victims)
+        self.stats['evicted'] += len(victims)
+
+    def report(self):
+        '''One line summary of the cache counters.'''
+        stats = self.stats
+        return (f"ROR cache: {stats['hits']} hits, {stats['misses']} misses, "
+                f"{stats['revalidated']} revalidated, {stats['refreshed']} refreshed, "
+                f"{stats['evicted']} evicted ({self.path})")
@@ -0,0 +1,168 @@
+"""
+Connection-pooled client for the ROR API.
+
+Each worker thread keeps its own keep-alive connection to the API host, so a
+batch of lookups costs one TCP/TLS handshake per worker rather than one per
+organisation. The base url can be pointed at a local stand-in server through
+the ROR_API_URL environment variable.
+
+Responses can be kept in a ror_cache.RORCache; fresh entries are served without
+touching the network and stale ones are revalidated with a conditional request.
+In offline mode only the cache is consulted. A ror_dump.RORDump built from the
+ROR data dump is consulted before either.
+
+Requests to the API can be paced by a rate_governor.RateGovernor shared by
+every worker thread; 429 and 5xx responses are retried after the governor's
+backoff (honouring Retry-After).
+
+Usage:
+    client = RORClient(max_workers=8)
+    records = client.fetch_many(['04cg70g73', '032e6b942'])
+"""
+
+import os
+import json
+import time
+import threading
+import http.client
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+from rate_governor import retry_after
+
+
+ROR_API = os.environ.get('ROR_API_URL', 'https://api.ror.org/organizations/')
+
+
+class RORClient:
+
+    def __init__(self, base_url=ROR_API, max_workers=8, timeout=30, cache=None, offline=False, dump=None,
+                 governor=None, retries=5):
+        parts = urlsplit(base_url)
+        self.https = parts.scheme == 'https'
+        self.netloc = parts.netloc
+        self.path = parts.path if parts.path.endswith('/') else parts.path + '/'
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.cache = cache
+        self.offline = offline
+        self.dump = dump
+        self.governor = governor
+        self.retries = retries
+        self._local = threading.local()
+
+    def _connection(self):
+        '''Return the keep-alive connection owned by the calling thread.'''
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            kind = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            conn = kind(self.netloc, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+        self._local.conn = None
+
+    def request(self, ror, headers=None):
+        '''
+        GET a single ROR record.
+
+        Returns (status, headers, body). A connection dropped by the server
+        between two requests is reopened once before giving up.
+        '''
+        headers = {'Accept': 'application/json', **(headers or {})}
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request('GET', self.path + ror, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+                return response.status, {k.lower(): v for k, v in response.getheaders()}, body
+            except (http.client.HTTPException, OSError):
+                self._drop_connection()
+                if attempt:
+                    raise
+
+    def governed_request(self, ror, headers=None):
+        '''
+        request(), paced by the governor and retried on 429 and 5xx responses.
+
+        The last response is returned once the retries are used up.
+        '''
+        for attempt in range(self.retries + 1):
+            if self.governor:
+                self.governor.acquire()
+            status, response_headers, body = self.request(ror, headers)
+            if status != 429 and status < 500:
+                if self.governor:
+                    self.governor.success()
+                return status, response_headers, body
+            if attempt < self.retries:
+                wait = retry_after(response_headers.get('retry-after'))
+                if self.governor:
+                    self.governor.backoff(attempt, wait)
+                else:
+                    time.sleep(wait if wait is not None else 2 ** attempt)
+        return status, response_headers, body
+
+    def fetch(self, ror):
+        '''Return the decoded ROR record, or None if ROR does not know the id.'''
+        if self.dump:
+            record = self.dump.get(ror)
+            if record:
+                return record
+
+        cached = self.cache.get(ror) if self.cache else None
+
+        if cached and (cached['fresh'] or self.offline):
+            self.cache.count('hits')
+            return json.loads(cached['body'])
+
+        if self.offline:
+            if self.cache:
+                self.cache.count('misses')
+            raise LookupError(f"{ror} is not in the ROR cache and offline mode is on")
+
+        headers = {}
+        if cached and cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        if cached and cached['last_modified']:
+            headers['If-Modified-Since'] = cached['last_modified']
+
+        status, response_headers, body = self.governed_request(ror, headers)
+
+        if status == 304 and cached:
+            self.cache.touch(ror)
+            self.cache.count('revalidated')
+            return json.loads(cached['body'])
+        if status == 404:
+            return None
+        if status != 200:
+            raise RuntimeError(f"ROR API returned {status} for {ror}")
+
+        if self.cache:
+            self.cache.count('refreshed' if cached else 'misses')
+            self.cache.put(ror, body, response_headers.get('etag'), response_headers.get('last-modified'))
+        return json.loads(body)
+
+    def fetch_many(self, rors, max_workers=None):
+        '''
+        Fetch several ROR records concurrently, over max_workers threads
+        (default: the client's max_workers).
+
+        Returns a dict of ror -> record. Lookups that raised are returned as
+        the exception instead of a record so one bad id does not stop a batch.
+        '''
+        rors = list(dict.fromkeys(rors))
+
+        def task(ror):
+            try:
+                return self.fetch(ror)
+            except Exception as err:
+                return err
+
+        with ThreadPoolExecutor(max_workers=max_workers or self.max_workers) as pool:
+            return dict(zip(rors, pool.map(task, rors)))
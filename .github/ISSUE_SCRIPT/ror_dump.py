@@ -0,0 +1,156 @@
+"""
+Offline lookup of ROR records from the official ROR data dump.
+
+The zipped dump (https://zenodo.org/communities/ror-data) is stream-parsed
+record by record and written to an indexed SQLite store keyed by ROR id, with
+secondary indexes on name, acronym, alias and label. Records are kept in the
+v1 schema which update_ror.ror_to_institution expects.
+
+Usage:
+    python ror_dump.py v1.55-2024-10-31-ror-data.zip [--store ror-dump.sqlite]
+
+Setting ROR_DUMP to the store path makes update_ror resolve ROR ids from it
+without touching the network.
+"""
+
+import io
+import sys
+import json
+import zlib
+import sqlite3
+import zipfile
+import argparse
+import threading
+from pathlib import Path
+
+
+DEFAULT_STORE = './ror-dump.sqlite'
+
+
+def dump_member(archive):
+    '''Pick the v1 JSON file out of the dump archive.'''
+    names = [n for n in archive.namelist() if n.endswith('.json') and 'schema_v2' not in n]
+    if not names:
+        raise ValueError(f"No v1 JSON file in {archive.filename}: {archive.namelist()}")
+    return names[0]
+
+
+def iter_records(stream, chunk_size=2**20):
+    '''
+    Yield the objects of a top level JSON array one at a time.
+
+    Only a chunk of the text and the record being decoded are held in memory.
+    '''
+    decoder = json.JSONDecoder()
+    buffer, pos = '', 0
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,[':
+            pos += 1
+
+        if pos == len(buffer):
+            buffer, pos = stream.read(chunk_size), 0
+            if not buffer:
+                return
+            continue
+
+        if buffer[pos] == ']':
+            return
+
+        try:
+            record, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                raise
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+
+        yield record
+
+
+def normalise(name):
+    return ' '.join(name.casefold().split())
+
+
+def record_names(record):
+    '''The (name, kind) pairs a record is indexed under.'''
+    yield record.get('name'), 'name'
+    for acronym in record.get('acronyms', []):
+        yield acronym, 'acronym'
+    for alias in record.get('aliases', []):
+        yield alias, 'alias'
+    for label in record.get('labels', []):
+        yield label.get('label'), 'label'
+
+
+class RORDump:
+
+    def __init__(self, path=DEFAULT_STORE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute('CREATE TABLE IF NOT EXISTS records (ror TEXT PRIMARY KEY, body BLOB NOT NULL) WITHOUT ROWID')
+        self._db.execute('CREATE TABLE IF NOT EXISTS names (name TEXT NOT NULL, kind TEXT NOT NULL, ror TEXT NOT NULL)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS names_name ON names (name)')
+
+    def ingest(self, zip_path, batch=5000):
+        '''Replace the store contents with the records of a zipped dump. Returns the record count.'''
+        count = 0
+        with zipfile.ZipFile(zip_path) as archive, self._lock, self._db:
+            self._db.execute('DELETE FROM records')
+            self._db.execute('DELETE FROM names')
+
+            with archive.open(dump_member(archive)) as raw:
+                stream = io.TextIOWrapper(raw, encoding='utf-8')
+                records, names = [], []
+                for record in iter_records(stream):
+                    ror = record['id'].split('/')[-1]
+                    records.append((ror, zlib.compress(json.dumps(record, separators=(',', ':')).encode())))
+                    names.extend((normalise(name), kind, ror) for name, kind in record_names(record) if name)
+                    count += 1
+
+                    if len(records) >= batch:
+                        self._write(records, names)
+                        records, names = [], []
+                self._write(records, names)
+
+        return count
+
+    def _write(self, records, names):
+        self._db.executemany('INSERT OR REPLACE INTO records VALUES (?, ?)', records)
+        self._db.executemany('INSERT INTO names VALUES (?, ?, ?)', names)
+
+    def get(self, ror):
+        '''Return the v1 ROR record for an id, or None.'''
+        with self._lock:
+            row = self._db.execute('SELECT body FROM records WHERE ror = ?', (ror,)).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def find(self, name, kind=None):
+        '''Return the (ror, kind) pairs whose name, acronym, alias or label matches name.'''
+        query = 'SELECT ror, kind FROM names WHERE name = ?'
+        args = [normalise(name)]
+        if kind:
+            query += ' AND kind = ?'
+            args.append(kind)
+        with self._lock:
+            return self._db.execute(query, args).fetchall()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM records').fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an indexed store from a zipped ROR data dump")
+    parser.add_argument("dump", help="Path to the zipped ROR data dump")
+    parser.add_argument("--store", default=DEFAULT_STORE, help="Path of the SQLite store to write")
+    args = parser.parse_args()
+
+    count = RORDump(args.store).ingest(args.dump)
+    print(f"✅ Ingested {count} ROR records into {args.store}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
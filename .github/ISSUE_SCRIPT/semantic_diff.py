@@ -0,0 +1,148 @@
+"""
+Field-level semantic diff of two organisation records.
+
+Two records are compared as data, not as text: key order is ignored, a key
+holding null is the same as a missing key, and the list fields whose order
+carries no meaning (aliases, labels, url, acronyms, type and the location's
+country) are compared as sets, an empty one being the same as a missing key.
+Nested objects are compared field by field, so a change is reported at its
+dotted path (e.g. `location.lat`).
+
+ChangeReport aggregates the changes of many files into per-field counts.
+
+Usage:
+    changes = diff(stored, fresh)
+    if changes:
+        print(describe(changes))
+
+    report = ChangeReport()
+    report.add('aer.json', changes)
+    print(report.table())
+"""
+
+import json
+from collections import defaultdict
+
+
+SET_FIELDS = {'aliases', 'labels', 'url', 'acronyms', 'type', 'location.country'}
+
+
+class Change:
+    __slots__ = ('path', 'kind', 'old', 'new', 'added', 'removed')
+
+    def __init__(self, path, kind, old=None, new=None, added=(), removed=()):
+        self.path = path
+        self.kind = kind          # 'added', 'removed' or 'changed'
+        self.old = old
+        self.new = new
+        self.added = list(added)
+        self.removed = list(removed)
+
+    def as_dict(self):
+        if self.added or self.removed:
+            return {'path': self.path, 'kind': self.kind, 'added': self.added, 'removed': self.removed}
+        return {'path': self.path, 'kind': self.kind, 'old': self.old, 'new': self.new}
+
+    def __repr__(self):
+        return f"Change({self.path!r}, {self.kind!r})"
+
+
+def _key(value):
+    # a hashable, order-independent form of any JSON value
+    return json.dumps(value, sort_keys=True)
+
+
+def _as_set(value):
+    items = value if isinstance(value, list) else [value]
+    return {_key(item): item for item in items if item is not None}
+
+
+def diff(old, new, path='', set_fields=SET_FIELDS):
+    '''The changes turning old into new, as a list of Change.'''
+    if path in set_fields:
+        # an empty set field holds nothing, as a null or missing one does
+        old = old if _as_set(old) else None
+        new = new if _as_set(new) else None
+    if old is None and new is None:
+        return []
+    if old is None:
+        return [Change(path, 'added', new=new)]
+    if new is None:
+        return [Change(path, 'removed', old=old)]
+
+    if path in set_fields:
+        before, after = _as_set(old), _as_set(new)
+        if before.keys() == after.keys():
+            return []
+        kind = 'added' if not before else 'removed' if not after else 'changed'
+        return [Change(path, kind, old, new,
+                       added=[after[k] for k in after.keys() - before.keys()],
+                       removed=[before[k] for k in before.keys() - after.keys()])]
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = []
+        for key in sorted(old.keys() | new.keys()):
+            changes += diff(old.get(key), new.get(key), f"{path}.{key}" if path else key, set_fields)
+        return changes
+
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        if all(not diff(a, b, path, set_fields) for a, b in zip(old, new)):
+            return []
+        return [Change(path, 'changed', old, new)]
+
+    # bool is an int in python, but true and 1 are different values in JSON
+    if type(old) is not type(new) and not (isinstance(old, (int, float)) and isinstance(new, (int, float))
+                                           and not isinstance(old, bool) and not isinstance(new, bool)):
+        return [Change(path, 'changed', old, new)]
+    return [] if old == new else [Change(path, 'changed', old, new)]
+
+
+def describe(changes):
+    '''One line per change, for the log of a run.'''
+    lines = []
+    for change in changes:
+        if change.added or change.removed:
+            parts = [f"+{_key(v)}" for v in change.added] + [f"-{_key(v)}" for v in change.removed]
+            lines.append(f"   {change.path}: {' '.join(parts)}")
+        elif change.kind == 'added':
+            lines.append(f"   {change.path}: added {_key(change.new)}")
+        elif change.kind == 'removed':
+            lines.append(f"   {change.path}: removed (was {_key(change.old)})")
+        else:
+            lines.append(f"   {change.path}: {_key(change.old)} -> {_key(change.new)}")
+    return '\n'.join(lines)
+
+
+class ChangeReport:
+    '''Changes of many files, aggregated per field.'''
+
+    def __init__(self):
+        self.files = {}
+        self.fields = defaultdict(lambda: {'added': 0, 'removed': 0, 'changed': 0, 'files': []})
+
+    def add(self, name, changes):
+        if not changes:
+            return
+        self.files[name] = [change.as_dict() for change in changes]
+        for change in changes:
+            field = self.fields[change.path]
+            field[change.kind] += 1
+            field['files'].append(name)
+
+    def __len__(self):
+        return len(self.files)
+
+    def table(self):
+        rows = [
+            "### Changed fields",
+            "| Field | Files | Added | Removed | Changed |",
+            "|---|---|---|---|---|",
+        ]
+        for path, field in sorted(self.fields.items(), key=lambda item: -len(item[1]['files'])):
+            rows.append(f"| {path} | {len(field['files'])} | {field['added']} | {field['removed']} | {field['changed']} |")
+        if not self.fields:
+            rows.append("| (none) | 0 | 0 | 0 | 0 |")
+        return '\n'.join(rows)
+
+    def as_dict(self):
+        return {'fields': dict(self.fields), 'files': self.files}
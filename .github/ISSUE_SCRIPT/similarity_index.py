@@ -0,0 +1,136 @@
+"""
+Character trigram index for finding near-duplicate organisations.
+
+Every name an organisation is known by (ui-label, validation-key, labels,
+aliases and acronyms) is split into padded character trigrams and stored in an
+inverted index. A query only scores the names that share at least one trigram
+with it, so looking up a new submission does not compare it against every
+existing organisation.
+
+The index is normally built from the Terms of a universe_store.Store that
+is already loaded, so the organisation files are only parsed once per run.
+
+Usage:
+    index = TrigramIndex.from_store(store)
+    index.query('University of Reading', k=5)
+"""
+
+import glob
+import heapq
+import json
+import os
+from collections import Counter, defaultdict
+
+
+NAME_FIELDS = ['ui-label', 'validation-key']
+LIST_FIELDS = ['labels', 'aliases', 'acronyms']
+
+
+def normalise(text):
+    return ' '.join(str(text).casefold().split())
+
+
+def trigrams(text):
+    padded = f"  {normalise(text)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def organisation_names(data):
+    '''All the names an organisation record is known by.'''
+    names = [data[field] for field in NAME_FIELDS if data.get(field)]
+    for field in LIST_FIELDS:
+        value = data.get(field) or []
+        names.extend([value] if isinstance(value, str) else value)
+    return [name for name in names if isinstance(name, str) and name.strip()]
+
+
+def term_names(term):
+    '''All the names a universe_store.Term is known by, as organisation_names.'''
+    names = [term.ui_label, term.validation_key, *term.labels, *term.acronyms]
+    return [name for name in names if isinstance(name, str) and name.strip()]
+
+
+class TrigramIndex:
+
+    def __init__(self):
+        self.names = []                  # entry -> (organisation id, name)
+        self.sizes = []                  # entry -> number of trigrams
+        self.postings = defaultdict(list)
+
+    def add(self, key, name):
+        entry = len(self.names)
+        grams = trigrams(name)
+        self.names.append((key, name))
+        self.sizes.append(len(grams))
+        for gram in grams:
+            self.postings[gram].append(entry)
+
+    def add_organisation(self, data):
+        key = data.get('id')
+        for name in dict.fromkeys(organisation_names(data)):
+            self.add(key, name)
+
+    def add_term(self, term):
+        for name in dict.fromkeys(term_names(term)):
+            self.add(term.id, name)
+
+    @classmethod
+    def from_store(cls, store, category='organisation'):
+        '''Index the terms of category from a loaded universe_store.Store.'''
+        index = cls()
+        for term in store.categories.get(category, ()):
+            index.add_term(term)
+        return index
+
+    @classmethod
+    def from_directory(cls, path):
+        index = cls()
+        for file in sorted(glob.glob(os.path.join(path, '*.json'))):
+            if any(skip in file for skip in ['graph.', '_context_']):
+                continue
+            with open(file, 'r', encoding='utf-8') as f:
+                index.add_organisation(json.load(f))
+        return index
+
+    def query(self, text, k=5, min_score=0.4, exclude=()):
+        '''
+        Return up to k (score, organisation id, matched name) tuples, best first.
+
+        The score is the Dice coefficient of the trigram sets, between 0 and 1.
+        Each organisation appears once, with its best matching name.
+        '''
+        grams = trigrams(text)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+
+        best = {}
+        for entry, count in shared.items():
+            key, name = self.names[entry]
+            if key in exclude:
+                continue
+            score = 2 * count / (len(grams) + self.sizes[entry])
+            if score >= min_score and score > best.get(key, (0,))[0]:
+                best[key] = (score, key, name)
+
+        return heapq.nlargest(k, best.values())
+
+    def report(self, *texts, k=5, exclude=()):
+        '''Markdown table of the near duplicates of any of texts, for git.update_summary.'''
+        matches = {}
+        for text in texts:
+            for score, key, name in self.query(text, k=k, exclude=exclude):
+                if score > matches.get(key, (0,))[0]:
+                    matches[key] = (score, key, name, text)
+
+        if not matches:
+            return "### Similar organisations\nNo existing organisation has a similar name."
+
+        rows = [f"| {key} | {name} | {text} | {score:.0%} |"
+                for score, key, name, text in heapq.nlargest(k, matches.values())]
+        return '\n'.join([
+            "### Similar organisations",
+            "| Existing id | Matched name | Submitted | Similarity |",
+            "|---|---|---|---|",
+            *rows,
+        ])
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Delta sync of the production branch from src-data.
+
+Run from a clean checkout of production. The production and src-data trees
+are compared by git object id, so unchanged directories are skipped by their
+tree ids without being walked, and only the paths that differ are touched:
+
+    added / updated  -> checked out from src-data in one batch
+    deleted          -> removed with git rm in one batch
+
+docs/, summaries/ and .github/ on production are never touched, and
+top-level dotfiles are not carried over, as the previous clean-and-restore
+workflow did. Files that production derives from the synced ones are not
+deleted for being absent from src-data: the graph.jsonld of each directory
+(built by the graph job) and the prepublish outputs whose source is still
+there (`<name>` of `<name>.json`, `_context.json` of `_context`, and the
+`<ror>.json` / `<ror>` aliases of the organisations). The changes are left staged, the changeset is printed, and
+`no_changes=true|false` is written to $GITHUB_OUTPUT when it is set.
+
+Usage:
+    python sync_production.py [--source origin/src-data] [--target HEAD] [--dry-run]
+"""
+
+import os
+import re
+import sys
+import argparse
+import posixpath
+import subprocess
+
+
+KEEP = ['docs', 'summaries', '.github']
+SHOW = 50
+
+GRAPH = 'graph.jsonld'
+ROR = re.compile(rb'"ror"\s*:\s*"(?:https?://ror\.org/)?([^"]+)"')
+
+
+def git(*args, input=None):
+    # paths are file names, never patterns: a '*', '?' or '[' in one must not match other files
+    return subprocess.run(['git', '--literal-pathspecs', *args], input=input, capture_output=True, check=True).stdout
+
+
+def kept(path, keep=KEEP):
+    top = path.split('/', 1)[0]
+    return top in keep or ('/' not in path and path.startswith('.'))
+
+
+def derived(path, sources, rors):
+    '''Is path an output production builds from the files of source, rather than a source file itself?'''
+    directory, name = posixpath.split(path)
+    if name == GRAPH:
+        return True
+    if name == '_context.json':
+        return posixpath.join(directory, '_context') in sources
+    if directory == 'organisation' and name.removesuffix('.json') in rors:
+        return True
+    return path + '.json' in sources
+
+
+def changeset(source, target, keep=KEEP):
+    '''Return {'A': [...], 'M': [...], 'D': [...]} of paths to bring target in line with source.'''
+    raw = git('diff', '--raw', '-z', '--no-renames', '--no-abbrev', target, source, '--').split(b'\0')
+    changes = {'A': [], 'M': [], 'D': []}
+    sources = set(git('ls-tree', '-r', '--name-only', '-z', source).decode('utf-8', 'surrogateescape').split('\0'))
+    rors = set()
+    if any(path.startswith('organisation/') for path in sources):
+        found = subprocess.run(['git', 'grep', '-h', '-E', '"ror"', source, '--', 'organisation/*.json'],
+                               capture_output=True).stdout
+        rors = {ror.decode() for ror in ROR.findall(found)}
+
+    # records are ':<mode> <mode> <sha> <sha> <status>' followed by the path
+    for meta, path in zip(raw[0::2], raw[1::2]):
+        if not meta:
+            continue
+        old_mode, new_mode, _, _, status = meta.decode()[1:].split(' ')
+        path = path.decode('utf-8', 'surrogateescape')
+        if '160000' in (old_mode, new_mode):
+            continue
+
+        if kept(path, keep) or status == 'D' and derived(path, sources, rors):
+            continue
+        changes['M' if status == 'T' else status[0]].append(path)
+
+    # top-level dotfiles are dropped from production, never synced
+    for entry in git('ls-tree', '-z', target).split(b'\0'):
+        if not entry:
+            continue
+        meta, name = entry.decode('utf-8', 'surrogateescape').split('\t', 1)
+        if meta.split(' ')[1] == 'blob' and name.startswith('.'):
+            changes['D'].append(name)
+
+    return changes
+
+
+def apply(changes, source):
+    '''Stage the changeset: deletions first, so a file can be replaced by a directory.'''
+    if changes['D']:
+        git('rm', '-q', '--ignore-unmatch', '--pathspec-from-file=-', '--pathspec-file-nul',
+            input='\0'.join(changes['D']).encode('utf-8', 'surrogateescape'))
+    updates = changes['A'] + changes['M']
+    if updates:
+        git('checkout', source, '--pathspec-from-file=-', '--pathspec-file-nul',
+            input='\0'.join(updates).encode('utf-8', 'surrogateescape'))
+
+
+def print_changeset(changes):
+    labels = {'A': ('➕', 'added'), 'M': ('✏️ ', 'updated'), 'D': ('➖', 'deleted')}
+    for status, (icon, label) in labels.items():
+        paths = changes[status]
+        if not paths:
+            continue
+        print(f"{icon} {len(paths)} {label}")
+        for path in paths[:SHOW]:
+            print(f"    {path}")
+        if len(paths) > SHOW:
+            print(f"    ... and {len(paths) - SHOW} more")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply only the src-data changes to the production checkout")
+    parser.add_argument("--source", default='origin/src-data', help="Branch to sync from")
+    parser.add_argument("--target", default='HEAD', help="Commit the working tree is checked out at")
+    parser.add_argument("--keep", nargs='*', default=KEEP, help="Top-level directories of the target never touched")
+    parser.add_argument("--dry-run", action="store_true", help="Only print the changeset")
+    args = parser.parse_args()
+
+    changes = changeset(args.source, args.target, args.keep)
+    total = sum(len(paths) for paths in changes.values())
+
+    print_changeset(changes)
+    print(f"🔄 {total} paths differ between {args.target} and {args.source}")
+
+    if not args.dry_run and total:
+        apply(changes, args.source)
+
+    if os.environ.get('GITHUB_OUTPUT'):
+        with open(os.environ['GITHUB_OUTPUT'], 'a') as f:
+            f.write(f"no_changes={'false' if total else 'true'}\n")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
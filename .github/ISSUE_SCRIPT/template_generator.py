@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Incremental issue template generation from GEN_ISSUE_TEMPLATE.
+
+Each template is built from a `<name>.csv` field list and a `<name>.py` holding
+TEMPLATE_CONFIG and DATA. Dropdown options come from DATA or, for data sources
+DATA does not define (e.g. `organisation`, `activity`), from the keys of the
+matching content_summaries file. Each shared data source is resolved at most
+once per run.
+
+Every generated `.github/ISSUE_TEMPLATE/<name>.yml` starts with a comment
+holding a hash of its inputs: the CSV, the template .py and the resolved
+data-source contents. Templates whose hash is unchanged are not rewritten, and
+the output is deterministic, so an unchanged template never produces a commit.
+
+Usage:
+    python template_generator.py [--source .github/GEN_ISSUE_TEMPLATE/]
+                                 [--output .github/ISSUE_TEMPLATE/] [--force]
+"""
+
+import os
+import sys
+import csv
+import json
+import glob
+import runpy
+import hashlib
+import argparse
+from pathlib import Path
+
+
+HASH_PREFIX = '# source-hash: '
+SUMMARIES = './content_summaries/'
+
+
+def quote(value):
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def scalar(value):
+    '''A plain YAML scalar, quoted when it would otherwise be misread.'''
+    value = str(value)
+    if ': ' in value or value.startswith(('"', "'", '#', '[', '{', '&', '*', '!', '|', '>', '%', '@', '`')):
+        return quote(value)
+    return value
+
+
+def block(key, text, indent, width=80):
+    '''key: value, as a literal block when the text is long or spans several lines.'''
+    pad = ' ' * indent
+    lines = text.replace('\\n', '\n').split('\n')
+    if len(lines) == 1 and len(text) <= width:
+        return [f"{pad}{key}: {scalar(text)}"]
+    return [f"{pad}{key}: |", *(f"{pad}  {line}" for line in lines)]
+
+
+class DataSources:
+    '''Resolves dropdown data sources, each at most once per run.'''
+
+    def __init__(self, summaries=SUMMARIES):
+        self.summaries = summaries
+        self.resolved = {}
+
+    def get(self, name, data):
+        if name in data:
+            return list(data[name])
+        if name not in self.resolved:
+            path = os.path.join(self.summaries, f"wcrp-universe_{name}.json")
+            with open(path, 'r', encoding='utf-8') as f:
+                summary = json.load(f)
+            self.resolved[name] = sorted(summary.get(name, {}))
+        return self.resolved[name]
+
+
+def load(csv_path):
+    '''Fields and template module of one template, in field order.'''
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        fields = sorted(csv.DictReader(f), key=lambda row: int(row['field_order']))
+    module = runpy.run_path(str(Path(csv_path).with_suffix('.py')))
+    return fields, module.get('TEMPLATE_CONFIG', {}), module.get('DATA', {})
+
+
+def render(fields, config, data, sources):
+    '''Return the YAML text of a template and the data-source options it used.'''
+    used = {}
+    lines = [
+        f"name: {quote(config['name'])}",
+        f"description: {scalar(config['description'])}",
+        f"title: {quote(config['title'])}",
+        f"labels: {config.get('labels', [])!r}",
+        "body:",
+    ]
+
+    items = []
+    for field in fields:
+        kind = field['field_type']
+        item = [f"  - type: {kind}"]
+
+        if kind == 'markdown':
+            value = field['description'].replace('\\n', '\n').split('\n')
+            item += ["    attributes:", "      value: |", *(f"        {line}" for line in value)]
+        else:
+            item += [f"    id: {field['field_id']}", "    attributes:", f"      label: {scalar(field['label'])}"]
+            if field['description']:
+                item += block('description', field['description'], 6)
+            if field['placeholder']:
+                item.append(f"      placeholder: {quote(field['placeholder'])}")
+            if kind == 'dropdown':
+                options = sources.get(field['data_source'], data)
+                used[field['data_source']] = options
+                item += ["      options:", *(f"        - {quote(option)}" for option in options)]
+                if field['default_value'] != '':
+                    item.append(f"      default: {field['default_value']}")
+
+        if field['required'].lower() == 'true':
+            item += ["    validations:", "      required: true"]
+
+        items.append('\n'.join(item))
+
+    return '\n'.join(lines) + '\n' + '\n\n'.join(items) + '\n', used
+
+
+def input_hash(csv_path, used):
+    digest = hashlib.sha256()
+    for path in (csv_path, Path(csv_path).with_suffix('.py')):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    digest.update(json.dumps(used, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def stored_hash(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            first = f.readline()
+    except FileNotFoundError:
+        return None
+    return first[len(HASH_PREFIX):].strip() if first.startswith(HASH_PREFIX) else None
+
+
+def render_config(source, output):
+    '''config.yml from _config.json, with blank issues disabled.'''
+    with open(os.path.join(source, '_config.json'), 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    lines = ["blank_issues_enabled: false", "contact_links:"]
+    for link in config.get('links', []):
+        lines += [f"- name: {scalar(link['name']) or repr('')}",
+                  f"  url: {scalar(link['url']) or repr('')}",
+                  f"  description: {scalar(link['description']) or repr('')}"]
+    text = '\n'.join(lines) + '\n'
+
+    path = os.path.join(output, 'config.yml')
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == text:
+                return False
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate the issue templates whose inputs changed")
+    parser.add_argument("--source", default='.github/GEN_ISSUE_TEMPLATE/', help="Directory of csv/py template pairs")
+    parser.add_argument("--output", default='.github/ISSUE_TEMPLATE/', help="Directory to write the templates to")
+    parser.add_argument("--summaries", default=SUMMARIES, help="content_summaries directory for shared data sources")
+    parser.add_argument("--force", action="store_true", help="Rewrite every template")
+    args = parser.parse_args()
+
+    sources = DataSources(args.summaries)
+    written = unchanged = 0
+
+    for csv_path in sorted(glob.glob(os.path.join(args.source, '*.csv'))):
+        name = Path(csv_path).stem
+        target = os.path.join(args.output, f"{name}.yml")
+
+        try:
+            fields, config, data = load(csv_path)
+            text, used = render(fields, config, data, sources)
+        except Exception as err:
+            print(f"❌ {name}: {err}")
+            continue
+
+        digest = input_hash(csv_path, used)
+        if not args.force and stored_hash(target) == digest:
+            unchanged += 1
+            continue
+
+        with open(target, 'w', encoding='utf-8') as f:
+            f.write(f"{HASH_PREFIX}{digest}\n{text}")
+        written += 1
+        print(f"✅ {name}.yml regenerated")
+
+    if render_config(args.source, args.output):
+        print("✅ config.yml regenerated")
+
+    print(f"📊 {written} templates regenerated, {unchanged} unchanged, "
+          f"{len(sources.resolved)} shared data sources resolved")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
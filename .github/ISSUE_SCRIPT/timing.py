@@ -0,0 +1,95 @@
+"""
+Lightweight span timing for the issue and refresh scripts.
+
+Enabled by setting ISSUE_TIMING=1. When disabled, span() hands back one shared
+no-op context manager, so instrumented code pays a function call and nothing
+more.
+
+When enabled, report() renders a per-stage table (for git.update_summary or
+stdout) and writes every span as a Chrome trace (chrome://tracing, Perfetto)
+to ISSUE_TIMING_TRACE, default ./issue-timing.json, for CI to archive.
+
+Usage:
+    with timing.span('git.newpull'):
+        git.newpull(...)
+    timing.report(git.update_summary)
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import nullcontext
+from collections import defaultdict
+
+from ror_cache import env_flag
+
+
+ENABLED = env_flag('ISSUE_TIMING')
+TRACE = os.environ.get('ISSUE_TIMING_TRACE', './issue-timing.json')
+
+_NULL = nullcontext()
+_spans = []
+_lock = threading.Lock()
+
+
+class _Span:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        with _lock:
+            _spans.append((self.name, self.start, end, threading.get_ident()))
+        return False
+
+
+def span(name):
+    '''Context manager timing the enclosed block under name.'''
+    return _Span(name) if ENABLED else _NULL
+
+
+def table():
+    '''Markdown table of calls and time per stage, slowest first.'''
+    stages = defaultdict(list)
+    for name, start, end, _ in _spans:
+        stages[name].append(end - start)
+
+    rows = sorted(stages.items(), key=lambda item: -sum(item[1]))
+    return '\n'.join([
+        "### Timing",
+        "| Stage | Calls | Total (ms) | Mean (ms) | Max (ms) |",
+        "|---|---|---|---|---|",
+        *(f"| {name} | {len(d)} | {sum(d) * 1000:.1f} | {sum(d) / len(d) * 1000:.1f} | {max(d) * 1000:.1f} |"
+          for name, d in rows),
+    ])
+
+
+def write_trace(path=TRACE):
+    '''Write the recorded spans as Chrome trace events.'''
+    origin = min((start for _, start, _, _ in _spans), default=0)
+    events = [{
+        'name': name,
+        'ph': 'X',
+        'ts': round((start - origin) * 1e6, 1),
+        'dur': round((end - start) * 1e6, 1),
+        'pid': os.getpid(),
+        'tid': tid,
+    } for name, start, end, tid in _spans]
+
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+def report(output=print):
+    '''Send the timing table to output and write the trace file, if timing is enabled.'''
+    if not ENABLED or not _spans:
+        return
+    output(table())
+    write_trace()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Stream the universe to and from JSON Lines.
+
+export writes one line per term, {"category": ..., "data": {...}}, reading the
+category directories one file at a time, so memory does not grow with the
+size of the universe.
+
+import reads such a changeset line by line. Each record is fixed as cmipld's
+validate_and_fix_json would fix its file (see validate_universe.check_record);
+only files whose content or key order differs from what is on disk are
+written, atomically and in cmipld's format. Every --batch records, the
+organisation records are validated with batch_validation and the changed
+files are committed as one commit through a single `git fast-import`.
+
+Usage:
+    python universe_jsonl.py export [--category organisation ...] [-o universe.jsonl]
+    python universe_jsonl.py import changes.jsonl [--batch 5000] [--author LOGIN] [--message MSG] [--check]
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+from pathlib import Path
+from collections import OrderedDict
+
+# set the path to read local files
+sys.path.append(str(Path(__file__).parent))
+
+import timing
+import gitbatch
+import batch_validation
+from validate_universe import SKIP, atomic_write, check_record, render
+
+
+def categories_of(src):
+    return sorted(entry.name for entry in os.scandir(src) if entry.is_dir() and not entry.name.startswith('.'))
+
+
+def iter_terms(src='./src-data/', categories=None):
+    '''Yield (category, data) for every term file, one file at a time.'''
+    for category in categories or categories_of(src):
+        directory = os.path.join(src, category)
+        names = sorted(entry.name for entry in os.scandir(directory) if entry.name.endswith('.json'))
+        for name in names:
+            if any(skip in name for skip in SKIP):
+                continue
+            with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                yield category, json.load(f, object_pairs_hook=OrderedDict)
+
+
+def export(out, src='./src-data/', categories=None):
+    '''Write every term as a line of out. Returns the number of lines.'''
+    count = 0
+    for category, data in iter_terms(src, categories):
+        out.write(json.dumps({'category': category, 'data': data}, ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+
+def iter_records(lines):
+    '''Yield (line number, category, data) for each non-blank line of a changeset.'''
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        record = json.loads(line, object_pairs_hook=OrderedDict)
+        if not isinstance(record, dict) or not isinstance(record.get('data'), dict) or not record.get('category'):
+            raise ValueError(f"line {number}: expected {{\"category\": ..., \"data\": {{...}}}}")
+        yield number, record['category'], record['data']
+
+
+def prepare(records, src='./src-data/'):
+    '''
+    Check every record and compare it with the file on disk.
+
+    Yields (line number, path, data, text to write or None if unchanged, errors).
+    '''
+    for number, category, data in records:
+        if not os.path.isdir(os.path.join(src, category)):
+            yield number, None, data, None, [f"unknown category {category!r}"]
+            continue
+
+        stem = str(data.get('id') or '').lower()
+        if not stem or os.sep in stem or stem.startswith('.'):
+            yield number, None, data, None, [f"invalid id {data.get('id')!r}"]
+            continue
+
+        path = os.path.join(src, category, stem + '.json')
+        data = check_record(data, category, stem)
+        text = render(data)
+        try:
+            # compared as data in key order, so a file differing in layout alone is left as it is
+            with open(path, 'r', encoding='utf-8') as f:
+                if json.dumps(json.load(f, object_pairs_hook=OrderedDict)) == json.dumps(data):
+                    text = None
+        except (FileNotFoundError, ValueError):
+            pass
+        yield number, path, data, text, []
+
+
+def default_author():
+    '''The (name, email) git would commit as.'''
+    ident = subprocess.run(['git', 'var', 'GIT_AUTHOR_IDENT'], capture_output=True, text=True, check=True).stdout
+    name, rest = ident.split(' <', 1)
+    return name, rest.split('>', 1)[0]
+
+
+class Importer:
+
+    def __init__(self, author, message, batch=5000, write=True):
+        self.author, self.message, self.batch, self.write = author, message, batch, write
+        self.commits = gitbatch.BatchCommitter()
+        self.counts = {'records': 0, 'changed': 0, 'unchanged': 0, 'failing': 0, 'commits': 0}
+        self.failing = []
+
+    def fail(self, number, path, errors):
+        self.counts['failing'] += 1
+        self.failing.append((number, path, errors))
+
+    def apply(self, chunk):
+        '''Validate a chunk of prepared records, then write and commit the changed files.'''
+        organisations = [item for item in chunk if not item[4] and batch_validation.record_kind(item[2])]
+        errors = batch_validation.new_errors()
+        if organisations:
+            with timing.span('pydantic.batch'):
+                batch_validation.validate_records([item[2] for item in organisations],
+                                                  keys=[item[0] for item in organisations], errors=errors)
+        invalid = {}
+        for key, loc, msg in zip(errors['key'], errors['loc'], errors['msg']):
+            invalid.setdefault(key, []).append(f"{loc}: {msg}")
+
+        written = []
+        for number, path, data, text, errs in chunk:
+            errs = errs + invalid.get(number, [])
+            if errs:
+                self.fail(number, path, errs)
+            elif text is None:
+                self.counts['unchanged'] += 1
+            else:
+                self.counts['changed'] += 1
+                if self.write:
+                    atomic_write(path, text)
+                    written.append(path)
+
+        if written:
+            part = self.counts['commits'] + 1
+            message = self.message if part == 1 else f"{self.message} (part {part})"
+            with timing.span('git.fast_import'):
+                self.commits.add_files(written, self.author, message)
+                self.commits.flush()
+            self.counts['commits'] += 1
+
+    def run(self, lines, src='./src-data/'):
+        chunk = []
+        for item in prepare(iter_records(lines), src):
+            self.counts['records'] += 1
+            chunk.append(item)
+            if len(chunk) >= self.batch:
+                self.apply(chunk)
+                chunk = []
+        if chunk:
+            self.apply(chunk)
+        return self.counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream the universe to and from JSON Lines")
+    parser.add_argument("--src", default='./src-data/', help="Directory holding the category directories")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    out = commands.add_parser('export', help="Write every term of the selected categories as JSON Lines")
+    out.add_argument("--category", action='append', help="Category to export (repeatable, default: all)")
+    out.add_argument("-o", "--output", default='-', help="Output file (default: stdout)")
+
+    load = commands.add_parser('import', help="Apply a JSON Lines changeset, committing once per batch")
+    load.add_argument("changes", nargs='?', default='-', help="Changeset file (default: stdin)")
+    load.add_argument("--batch", type=int, default=5000, help="Records validated and committed together")
+    load.add_argument("--author", help="GitHub login to commit as (default: the git author)")
+    load.add_argument("--message", default='Bulk update from JSON Lines', help="Commit message")
+    load.add_argument("--check", action="store_true", help="Report what would change without writing")
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        if args.output == '-':
+            count = export(sys.stdout, args.src, args.category)
+        else:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                count = export(f, args.src, args.category)
+        print(f"📤 Exported {count} terms", file=sys.stderr)
+        return 0
+
+    importer = Importer(args.author or default_author(), args.message, batch=args.batch, write=not args.check)
+    if args.changes == '-':
+        counts = importer.run(sys.stdin, args.src)
+    else:
+        with open(args.changes, 'r', encoding='utf-8') as f:
+            counts = importer.run(f, args.src)
+
+    for number, path, errors in importer.failing:
+        print(f"❌ line {number} {path or ''}: {'; '.join(errors)}")
+    print(f"📥 {counts['records']} records: {counts['changed']} {'to change' if args.check else 'changed'}, "
+          f"{counts['unchanged']} unchanged, {counts['failing']} failing, {counts['commits']} commits")
+    timing.report(print)
+    return 1 if counts['failing'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
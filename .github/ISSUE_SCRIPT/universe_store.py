@@ -0,0 +1,177 @@
+"""
+In-memory indexed store of the universe vocabulary.
+
+Every category is parsed once into compact Term records (slotted objects with
+interned strings) and indexed by id, validation-key, ror and type, so lookups
+and uniqueness checks are dictionary hits instead of a re-glob of src-data.
+
+The store can be built from a checkout of the src-data branch or, when only
+the main branch is available, from the content_summaries files.
+
+Usage:
+    store = Store.from_checkout('./src-data/')
+    store.acronym_used('MOHC')
+    store.by_ror['02wn1k260']
+    print(store.memory_report())
+"""
+
+import os
+import sys
+import glob
+import json
+from collections import defaultdict
+
+
+SKIP = ['graph.', '_context_']
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Term:
+    __slots__ = ('category', 'id', 'validation_key', 'type', 'ror', 'ui_label', 'acronyms', 'labels', 'path')
+
+    def __init__(self, category, id, validation_key=None, type=(), ror=None, ui_label=None, acronyms=(), labels=(), path=None):
+        self.category = _intern(category)
+        self.id = _intern(id)
+        self.validation_key = _intern(validation_key)
+        self.type = tuple(_intern(t) for t in type)
+        self.ror = ror
+        self.ui_label = ui_label
+        self.acronyms = tuple(acronyms)
+        self.labels = tuple(labels)          # labels and aliases, for the similarity index
+        self.path = path
+
+    @classmethod
+    def from_json(cls, category, data, path=None):
+        types = data.get('type', [])
+        acronyms = data.get('acronyms') or []
+        labels = []
+        for field in ['labels', 'aliases']:
+            value = data.get(field) or []
+            labels.extend([value] if isinstance(value, str) else value)
+        return cls(
+            category,
+            data.get('id'),
+            validation_key=data.get('validation-key'),
+            type=[types] if isinstance(types, str) else types,
+            ror=data.get('ror'),
+            ui_label=data.get('ui-label'),
+            acronyms=[acronyms] if isinstance(acronyms, str) else acronyms,
+            labels=labels,
+            path=path,
+        )
+
+    def __repr__(self):
+        return f"Term({self.category}:{self.id})"
+
+
+class Store:
+
+    def __init__(self):
+        self.categories = defaultdict(list)
+        self.terms = {}                      # (category, id) -> Term
+        self.by_id = defaultdict(list)
+        self.by_key = defaultdict(list)
+        self.by_ror = {}
+        self.by_type = defaultdict(list)
+        self._names = defaultdict(set)       # category -> casefolded ids, keys and acronyms
+
+    def add(self, term):
+        self.categories[term.category].append(term)
+        self.terms[term.category, term.id] = term
+        self.by_id[term.id].append(term)
+        if term.validation_key:
+            self.by_key[term.validation_key].append(term)
+        if term.ror and term.ror != 'pending':
+            self.by_ror[term.ror] = term
+        for t in term.type:
+            self.by_type[t].append(term)
+
+        names = self._names[term.category]
+        for name in (term.id, term.validation_key, *term.acronyms):
+            if isinstance(name, str):
+                names.add(name.casefold())
+
+    @classmethod
+    def from_checkout(cls, root='./src-data/', categories=None):
+        '''Load every category directory (or only those listed) of a src-data checkout.'''
+        store = cls()
+        for directory in sorted(glob.glob(os.path.join(root, '*/'))):
+            category = os.path.basename(os.path.normpath(directory))
+            if category.startswith('.') or (categories and category not in categories):
+                continue
+            for file in sorted(glob.glob(os.path.join(directory, '*.json'))):
+                if any(skip in file for skip in SKIP):
+                    continue
+                with open(file, 'r', encoding='utf-8') as f:
+                    store.add(Term.from_json(category, json.load(f), path=file))
+        return store
+
+    @classmethod
+    def from_summaries(cls, root='./content_summaries/'):
+        '''
+        Load the content_summaries files.
+
+        Summaries are keyed by validation-key and only carry a few fields, so
+        the id is taken as the lower-cased key, as the issue scripts do.
+        '''
+        store = cls()
+        for file in sorted(glob.glob(os.path.join(root, '*_*.json'))):
+            with open(file, 'r', encoding='utf-8') as f:
+                summary = json.load(f)
+            summary.pop('Header', None)
+            for category, entries in summary.items():
+                for key, value in entries.items():
+                    value = value if isinstance(value, dict) else {'ui_label': value}
+                    acronyms = value.get('acronyms') or []
+                    store.add(Term(
+                        category,
+                        key.lower(),
+                        validation_key=key,
+                        ror=value.get('ror'),
+                        ui_label=value.get('ui_label'),
+                        acronyms=[acronyms] if isinstance(acronyms, str) else acronyms,
+                        path=file,
+                    ))
+        return store
+
+    def get(self, category, id):
+        return self.terms.get((category, id))
+
+    def acronym_used(self, acronym, category='organisation'):
+        '''Is acronym already used as an id, validation-key or acronym in category.'''
+        return acronym.casefold() in self._names[category]
+
+    def memory_report(self):
+        '''Approximate bytes held per category by the Term records and their values.'''
+        report = {}
+        for category, terms in self.categories.items():
+            seen = set()
+            size = sys.getsizeof(terms)
+            for term in terms:
+                size += sys.getsizeof(term)
+                for slot in Term.__slots__:
+                    value = getattr(term, slot)
+                    values = value if isinstance(value, tuple) else (value,)
+                    size += sys.getsizeof(value) if isinstance(value, tuple) else 0
+                    for v in values:
+                        if id(v) not in seen:
+                            seen.add(id(v))
+                            size += sys.getsizeof(v)
+            report[category] = {'terms': len(terms), 'bytes': size}
+        return report
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load the universe and report memory use per category")
+    parser.add_argument("path", nargs='?', default='./src-data/', help="src-data checkout or content_summaries directory")
+    parser.add_argument("--summaries", action="store_true", help="path holds content_summaries files")
+    args = parser.parse_args()
+
+    store = Store.from_summaries(args.path) if args.summaries else Store.from_checkout(args.path)
+    for category, stats in sorted(store.memory_report().items()):
+        print(f"{category:40} {stats['terms']:6} terms {stats['bytes'] / 1024:10.1f} KiB")
@@ -1,26 +1,49 @@
 
 
-import cmipld
+import sys
+from pathlib import Path
+# set the path to read ror_client.
+sys.path.append(str(Path(__file__).parent))
+
+import os
 import json
-from cmipld.tests.jsonld import organisation
-from pydantic import  ValidationError
+
+from ror_client import RORClient
+from ror_cache import RORCache, env_flag
+from ror_dump import RORDump
+from rate_governor import RateGovernor
+import timing
 
 
 repopath = './src-data/organisation/'
 
+_client = None
 
-def get_institution(ror, acronym):
 
-    mytype = 'institution'
+def get_client():
+    '''The shared RORClient, built on first use so importing this module opens no cache or dump.'''
+    global _client
+    if _client is None:
+        _client = RORClient(
+            cache=RORCache.from_env(),
+            offline=env_flag('ROR_OFFLINE'),
+            dump=RORDump(os.environ['ROR_DUMP']) if os.environ.get('ROR_DUMP') else None,
+            governor=RateGovernor.from_env(),
+        )
+    return _client
 
-    ror_template = 'https://api.ror.org/organizations/{}'
 
-    url = ror_template.format(ror)
+def __getattr__(name):
+    # update_ror.client is still available, but only built when first accessed
+    if name == 'client':
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-    ror_data = cmipld.utils.read_url(url)
 
-    assert ror_data, f"ROR data not found for {ror},{acronym} in {url}. Exiting Now."
-    
+def ror_to_institution(ror_data, acronym):
+
+    mytype = 'institution'
+
     # ensure the acronym has no _
     cmip_acronym = acronym.replace('_','-')
     
@@ -51,64 +74,133 @@ def get_institution(ror, acronym):
     
     return ror_data
 
+
+def get_institution(ror, acronym):
+
+    client = get_client()
+    with timing.span('ror.http'):
+        ror_data = client.fetch(ror)
+
+    assert ror_data, f"ROR data not found for {ror},{acronym} in {client.path}{ror}. Exiting Now."
+
+    return ror_to_institution(ror_data, acronym)
+
+
+def get_institutions(entries, max_workers=None):
+    '''
+    Batch version of get_institution.
+    
+    entries is an iterable of (ror, acronym) pairs. The ROR records are fetched
+    concurrently over pooled connections and a list aligned with entries is
+    returned, holding either the institution data or the exception raised for it.
+    max_workers applies to this call only (default: the client's).
+    '''
+    entries = list(entries)
+    
+    client = get_client()
+    with timing.span('ror.http.batch'):
+        records = client.fetch_many((ror for ror, _ in entries), max_workers=max_workers)
+    
+    results = []
+    for ror, acronym in entries:
+        ror_data = records[ror]
+        if isinstance(ror_data, Exception):
+            results.append(ror_data)
+        elif not ror_data:
+            results.append(AssertionError(f"ROR data not found for {ror},{acronym} in {client.path}{ror}."))
+        else:
+            results.append(ror_to_institution(ror_data, acronym))
+    
+    return results
+
     
 
 
 if __name__ == '__main__':
-    from p_tqdm import p_map
     import glob
+    import argparse
+    import batch_validation
+    import checkpoint
+    import semantic_diff
+    
+    parser = argparse.ArgumentParser(description="Refresh every institution from ROR")
+    parser.add_argument("--report", help="Write the validation errors as JSON to this path")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted run, skipping the files its journal records as done")
+    parser.add_argument("--journal", default='./.update_ror.journal', help="Path of the checkpoint journal")
+    parser.add_argument("--checkpoint-every", type=int, default=100, help="Files fetched, written and journaled together")
+    args = parser.parse_args()
     
     files = glob.glob(repopath+'*.json')
     # print(files)
     
-    def update(file):
+    contents = {file: json.load(open(file)) for file in files}
+    
+    institutions = [file for file, data in contents.items() if 'wcrp:institution' in data.get('type', [])]
+    
+    journal = checkpoint.Journal(args.journal, resume=args.resume)
+    # institutions whose fetch failed are fetched again
+    done = {key for key, entry in journal.done.items() if entry['result'] != 'failed'}
+    todo = [file for file in sorted(institutions) if file not in done]
+    if args.resume:
+        earlier = sum(entry['result'] == 'invalid' for entry in journal.done.values())
+        print(f"⏩ Resuming: {len(done)} institutions already done, {earlier} of them failed validation, "
+              f"{len(journal) - len(done)} failed fetches to retry")
+    
+    errors = batch_validation.new_errors()
+    step = max(1, args.checkpoint_every)
+    for start in range(0, len(todo), step):
+        chunk = todo[start:start + step]
         
-        data = json.load(open(file))
+        # fetch the ROR records of the chunk in one concurrent batch
+        fetched = get_institutions((contents[file]['ror'], contents[file]['validation-key']) for file in chunk)
+        fetched = dict(zip(chunk, fetched))
         
-        match data:
-            case {"type":ldtypes} if 'wcrp:institution' in ldtypes:
-                try:
-                    data = get_institution(data['ror'],data['validation-key'])
-                    organisation.institution(**data)
-                except ValidationError as err:
-                    return 'institution',data['ror'],data['validation-key'],err.errors()[0]
-                    
-                
-            case {"type":ldtypes} if 'wcrp:consortium' in ldtypes:
-                errors = []
-                return errors
+        # validate the refreshed records of the chunk in one call
+        updated = {file: data for file, data in fetched.items() if not isinstance(data, Exception)}
+        with timing.span('pydantic.batch'):
+            batch_validation.validate_records(list(updated.values()), keys=list(updated), errors=errors)
+        
+        for file, err in fetched.items():
+            if isinstance(err, Exception):
+                batch_validation.add_error(errors, file, 'institution', contents[file], ['ror'], str(err))
+        
+        invalid = set(errors['key'])
+        results = {}
+        for file in chunk:
+            if isinstance(fetched[file], Exception):
+                results[file] = 'failed'
+            elif file in invalid:
+                results[file] = 'invalid'
+            elif semantic_diff.diff(contents[file], updated[file]):
+                # only rewrite files whose content changed, not just their key or list order
+                with open(file,'w') as f:
+                    json.dump(updated[file],f,indent=4) 
+                results[file] = 'updated'
+            else:
+                results[file] = 'unchanged'
+        
+        journal.record_many([{'key': file, 'result': result} for file, result in results.items()])
+    
+    for file, data in contents.items():
+        
+        if file in institutions or 'wcrp:consortium' in data.get('type', []):
+            continue
                 
         with open(file,'w') as f:
             json.dump(data,f,indent=4) 
+    
+    journal.finish()
+    
+    if get_client().cache:
+        print(get_client().cache.report())
+    if get_client().governor:
+        print(get_client().governor.report())
+    
+    timing.report()
+    
+    if args.report:
+        with open(args.report,'w') as f:
+            json.dump(errors,f,indent=4)
         
-    # run on all files
-    errors = p_map(update,files)
-    errors = [i for i in errors if i]
-        
-    if errors: 
-        from rich.console import Console
-        from rich.table import Table
-        from rich.text import Text
-        console = Console()
-            
-        console.print(Text("Validation Errors", style="bold red underline"))
-
-        # Create a table
-        table = Table(show_header=True, header_style="bold white")
-        
-        table.add_column("Type", style="bold green")  # Green
-        table.add_column("Item", style="bold blue")  # Blue
-        table.add_column("Warnings", style="red")  # Red for errors (bullet points)
-
-
-        for kind,ror,validation_key,err in errors:
-            # print('eee',err)
-            table.add_row(
-                kind,
-                f"{ror}: {validation_key}",
-                f"[{err['loc'][0]}]:\n {err['msg']}"
-            )
-
-
-        console.print(table)
-            
+    if errors['key']: 
+        batch_validation.print_table(errors)
@@ -3,8 +3,27 @@
 Update all the organisation institution files keeping the original authors. 
 
 Usage:
-    python upgrade_organisations.py [--dry-run]
-    
+    python upgrade_organisations.py [--dry-run] [--workers N] [--ror-dump STORE]
+                                    [--incremental] [--recheck-days N] [--manifest PATH]
+                                    [--resume] [--journal PATH] [--checkpoint-every N]
+                                    [--diff-report PATH]
+
+With --incremental, a file whose content hash matches the manifest of the
+previous run is skipped without a ROR lookup; with --recheck-days, only if
+its ROR record was also checked within that many days, otherwise the record
+is fetched and the file skipped if the ROR-derived record is unchanged too.
+The workflow commits the manifest with the files it describes.
+
+Files are fetched, updated and committed in chunks of --checkpoint-every; after
+each chunk's commits are written, its files are appended to a checkpoint
+journal. If the run is interrupted, --resume skips the files the journal
+records as done, retries the ones it records as failed, and restores any file
+the interrupted run changed but did not commit.
+
+A file is only rewritten and committed when the ROR-derived record differs
+from it semantically (see semantic_diff); the changed fields are logged per
+file and summarised in one table. --dry-run fetches and shows the same diff
+without writing.
 """
 
 import sys
@@ -14,36 +33,94 @@ import os
 import glob
 import subprocess
 import argparse
+import hashlib
+from datetime import datetime, timezone
 from collections import OrderedDict
 
 # Add parent directory to path to import update_ror
 sys.path.append(str(Path(__file__).parent))
 
 import update_ror
-from cmipld.utils import git,jsontools
+import gitbatch
+import checkpoint
+import semantic_diff
+import timing
 
 # Path to organization data
 repopath = './src-data/organisation/'
 
+# Hashes of the inputs each file was last processed from
+manifest_path = './.upgrade_organisations.manifest.json'
+
+# Files completed by the current run, kept until the run ends
+journal_path = './.upgrade_organisations.journal'
+
+
+def content_hash(filepath):
+    with open(filepath, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def record_hash(data):
+    """Hash of a ROR-derived record, or None if there is no record"""
+    if not isinstance(data, dict):
+        return None
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def settled(entry, filepath, recheck_days=None):
+    """Does the manifest entry of an unchanged file spare it a ROR lookup"""
+    if not entry or entry['content'] != content_hash(filepath):
+        return False
+    if recheck_days is None:
+        return True
+    checked = datetime.fromisoformat(entry['last_run'])
+    return (datetime.now(timezone.utc) - checked).total_seconds() < recheck_days * 86400
+
+
+def load_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(path, manifest):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+
 
-def update(filepath, author, dry_run=False, update=False, comment='from upgrade_organisations.py'):
-    mod,stat =jsontools.validate_and_fix_json(filepath)
+def update(filepath, author, dry_run=False, update=False, comment='from upgrade_organisations.py', batch=None):
+    # cmipld is imported on first use, so --help and argument errors return at once
+    from cmipld.utils import git,jsontools
+    with timing.span('jsontools.validate_and_fix_json'):
+        mod,stat =jsontools.validate_and_fix_json(filepath)
                     
     if not dry_run and (mod or update):              
     # Commit with original author
-        git.commit_one(
-            filepath,
-            author,
-            comment=f"Update {Path(filepath).stem}: {comment}"
-        )
+        if batch is not None:
+            batch.add(filepath, author, f"Update {Path(filepath).stem}: {comment}")
+        else:
+            git.commit_one(
+                filepath,
+                author,
+                comment=f"Update {Path(filepath).stem}: {comment}"
+            )
 
 
-def process_organization_file(filepath, dry_run=False):
+def process_organization_file(filepath, dry_run=False, prefetched=None, author=None, batch=None, report=None):
     """Process a single organization file
     
     Args:
         filepath: Path to the organization file
         dry_run: If True, show what would be done without making changes
+        prefetched: Institution data (or the exception raised fetching it)
+            from update_ror.get_institutions, to avoid a request per file
+        author: (name, email) of the last author, from gitbatch.last_authors
+        batch: gitbatch.BatchCommitter to queue commits on instead of committing
+        report: semantic_diff.ChangeReport collecting the changed fields
         
     Returns:
         True if changes were made/would be made
@@ -51,7 +128,10 @@ def process_organization_file(filepath, dry_run=False):
         None if there was an error
     """
     # Get the last committer using cmipld utility
-    author = git.get_last_committer(filepath)
+    if author is None:
+        from cmipld.utils import git
+        with timing.span('git.get_last_committer'):
+            author = git.get_last_committer(filepath)
     if not author:
         print(f"⚠️  Could not get author for {filepath}, skipping...")
         return None
@@ -83,41 +163,47 @@ def process_organization_file(filepath, dry_run=False):
                 print(f"⚠️  No valid ROR for {filepath}, skipping...")
                 return None
             
-            if not dry_run:
-                print(f"🔄 Updating institution data from ROR: {ror}")
-                try:
-                    # Get updated data from ROR
+            print(f"🔄 {'Checking' if dry_run else 'Updating'} institution data from ROR: {ror}")
+            try:
+                # Get updated data from ROR
+                if prefetched is None:
                     new_data = update_ror.get_institution(ror, validation_key)
-                    
-                    # Check if data changed
-                    if json.dumps(original_data, sort_keys=True) == json.dumps(new_data, sort_keys=True):
-                        print(f"ℹ️  No changes from ROR - data is up to date")
-                        update(filepath, author, dry_run, update=False, comment='Updating file order.')
-                        return False
-                    
-                    
-                    
-                    # Write updated data directly to file
-                    with open(filepath, 'w', encoding='utf-8') as f:
-                        json.dump(new_data, f, indent=2, ensure_ascii=False)
-                        f.write('\n')
-                    
-                    print(f"✅ Successfully updated from ROR")
-                    
-                    update(filepath, author, dry_run, update=True, comment='new ROR data')
-                    
+                elif isinstance(prefetched, Exception):
+                    raise prefetched
+                else:
+                    new_data = prefetched
+                
+                # Compare field by field; key order and list order alone are not changes
+                changes = semantic_diff.diff(original_data, new_data)
+                if report is not None:
+                    report.add(Path(filepath).name, changes)
+                if not changes:
+                    print(f"ℹ️  No changes from ROR - data is up to date")
+                    return False
+                
+                print(semantic_diff.describe(changes))
+                if dry_run:
+                    print(f"🔄 Would update {len(changes)} fields from ROR")
                     return True
-                        
-                except Exception as e:
-                    print(f"❌ Error getting ROR data: {e}")
-                    return None
-            else:
-                print(f"🔄 Would update institution data from ROR: {ror}")
+                
+                # Write updated data directly to file
+                with open(filepath, 'w', encoding='utf-8') as f:
+                    json.dump(new_data, f, indent=2, ensure_ascii=False)
+                    f.write('\n')
+                
+                print(f"✅ Successfully updated from ROR")
+                
+                fields = ', '.join(dict.fromkeys(change.path.split('.')[0] for change in changes))
+                update(filepath, author, dry_run, update=True, comment=f'new ROR data ({fields})', batch=batch)
+                
                 return True
                     
+            except Exception as e:
+                print(f"❌ Error getting ROR data: {e}")
+                return None
+                    
         elif 'wcrp:consortium' in ldtypes:
             print(f"ℹ️  Consortium type - no ROR update available")
-            update(filepath, author, dry_run, update=False, comment='Updating file order.')
             return False
         else:
             print(f"⚠️  Unknown type in {filepath}, skipping...")
@@ -130,6 +216,34 @@ def process_organization_file(filepath, dry_run=False):
         return None
 
 
+def prefetch(files, workers):
+    """Fetch the ROR data for every institution among files in one concurrent batch"""
+    entries = {}
+    for filepath in files:
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception:
+            continue
+        ror = data.get('ror')
+        if 'wcrp:institution' in data.get('type', []) and ror and ror != 'pending':
+            entries[filepath] = (ror, data.get('validation-key'))
+    
+    print(f"🌐 Fetching {len(entries)} ROR records...")
+    fetched = update_ror.get_institutions(entries.values(), max_workers=workers)
+    return dict(zip(entries, fetched))
+
+
+def restore_unfinished(files):
+    """Restore files changed but not committed by an interrupted run"""
+    out = subprocess.run(['git', 'status', '--porcelain', '-z', '--untracked-files=no', '--', *files],
+                         capture_output=True, text=True, check=True).stdout
+    dirty = [entry[3:] for entry in out.split('\0') if entry]
+    if dirty:
+        print(f"♻️  Restoring {len(dirty)} files left uncommitted by the interrupted run")
+        subprocess.run(['git', 'checkout', '--', *dirty], check=True)
+
+
 def main():
     """Main function to process all organization files"""
     
@@ -142,12 +256,62 @@ def main():
         action="store_true",
         help="Show what would be done without making actual changes"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Number of concurrent ROR requests"
+    )
+    parser.add_argument(
+        "--ror-dump",
+        help="Resolve ROR ids from a store built by ror_dump.py instead of the API"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Skip files whose content and ROR record are unchanged since the last run"
+    )
+    parser.add_argument(
+        "--recheck-days",
+        type=float,
+        help="With --incremental, still look up unchanged files last checked more than this many days ago"
+    )
+    parser.add_argument(
+        "--manifest",
+        default=manifest_path,
+        help="Path of the content-hash manifest used by --incremental"
+    )
+    parser.add_argument(
+        "--diff-report",
+        help="Write the field-level changes of every file as JSON to this path"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run, skipping the files its journal records as done"
+    )
+    parser.add_argument(
+        "--journal",
+        default=journal_path,
+        help="Path of the checkpoint journal"
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=100,
+        help="Files fetched, committed and journaled together"
+    )
     args = parser.parse_args()
     
     if args.dry_run:
         print("🆗️ DRY RUN MODE - No changes will be made")
         print("="*50)
     
+    if args.ror_dump:
+        from ror_dump import RORDump
+        update_ror.client.dump = RORDump(args.ror_dump)
+        print(f"📦 Using ROR data dump: {args.ror_dump} ({len(update_ror.client.dump)} records)")
+    
     print("🚀 Starting organization file update from ROR...")
     
     # Get all JSON files (excluding graph files and context)
@@ -160,23 +324,122 @@ def main():
     successful = 0
     failed = 0
     unchanged = 0
+    skipped = 0
     
-    # Process each file
-    for filepath in sorted(files):
-        result = process_organization_file(filepath, dry_run=args.dry_run)
-        if result is None:
-            failed += 1
-        elif result:
-            successful += 1
-        else:
-            unchanged += 1
+    manifest = load_manifest(args.manifest)
+    
+    journal = None
+    todo = sorted(files)
+    if not args.dry_run:
+        journal = checkpoint.Journal(args.journal, resume=args.resume)
+        if args.resume:
+            # failed files (a fetch that ran out of retries) are tried again
+            done = [entry for entry in journal.done.values() if entry['result'] != 'failed']
+            print(f"⏩ Resuming: {len(done)} files already done, {len(journal) - len(done)} failed files to retry")
+            for entry in done:
+                if entry['result'] == 'updated':
+                    successful += 1
+                elif entry['result'] == 'unchanged':
+                    unchanged += 1
+                else:
+                    skipped += 1
+            finished = {entry['key'] for entry in done}
+            todo = [f for f in todo if Path(f).name not in finished]
+            restore_unfinished(todo)
+    
+    report = semantic_diff.ChangeReport()
+    
+    # One git log pass for every author, and one fast-import for every chunk of commits
+    with timing.span('git.last_authors'):
+        authors = gitbatch.last_authors(repopath)
+    batch = gitbatch.BatchCommitter()
+    
+    step = max(1, args.checkpoint_every)
+    for start in range(0, len(todo), step):
+        chunk = todo[start:start + step]
+        
+        done = []
+        if args.incremental:
+            # the content hash settles most files without fetching their ROR record
+            unsettled = []
+            for filepath in chunk:
+                if settled(manifest.get(Path(filepath).name), filepath, args.recheck_days):
+                    skipped += 1
+                    done.append({'key': Path(filepath).name, 'result': 'skipped'})
+                else:
+                    unsettled.append(filepath)
+            chunk = unsettled
+        
+        # Fetch the ROR data for every remaining institution of the chunk in one concurrent batch
+        prefetched = prefetch(chunk, args.workers) if chunk else {}
+        
+        for filepath in chunk:
+            key = Path(filepath).name
+            ror_hash = record_hash(prefetched.get(filepath))
+            
+            entry = manifest.get(key)
+            if args.incremental and entry and entry['content'] == content_hash(filepath) and entry['ror'] == ror_hash:
+                skipped += 1
+                done.append({'key': key, 'result': 'skipped'})
+                if not args.dry_run:
+                    entry['last_run'] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+                continue
+            
+            result = process_organization_file(
+                filepath,
+                dry_run=args.dry_run,
+                prefetched=prefetched.get(filepath),
+                author=authors.get(os.path.normpath(filepath)),
+                batch=batch,
+                report=report,
+            )
+            if result is None:
+                failed += 1
+                done.append({'key': key, 'result': 'failed'})
+                continue
+            elif result:
+                successful += 1
+            else:
+                unchanged += 1
+            done.append({'key': key, 'result': 'updated' if result else 'unchanged'})
+            
+            if not args.dry_run:
+                manifest[key] = {
+                    'content': content_hash(filepath),
+                    'ror': ror_hash,
+                    'last_run': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                }
+        
+        if not args.dry_run:
+            # the chunk is only journaled once its commits exist
+            print(f"\n📝 Writing {len(batch)} commits...")
+            with timing.span('git.commit'):
+                batch.flush()
+            save_manifest(args.manifest, manifest)
+            journal.record_many(done)
+    
+    if journal is not None:
+        journal.finish()
     
     # Summary
     print("\n" + "="*50)
     print(f"✅ Successfully updated: {successful} files")
     print(f"ℹ️  Unchanged: {unchanged} files (already up to date)")
     print(f"❌ Failed to process: {failed} files")
+    if args.incremental:
+        print(f"⏭️  Skipped: {skipped} files (unchanged since last run)")
     print(f"📊 Total files: {len(files)}")
+    if update_ror.client.cache:
+        print(f"🗄️  {update_ror.client.cache.report()}")
+    if update_ror.client.governor:
+        print(f"🚦 {update_ror.client.governor.report()}")
+    print(report.table())
+    if args.diff_report:
+        with open(args.diff_report, 'w', encoding='utf-8') as f:
+            json.dump(report.as_dict(), f, indent=2)
+    from cmipld.utils import git
+    git.update_summary(report.table())
+    timing.report(git.update_summary)
     
     # Create a branch and push if we made changes
     if successful > 0 and not args.dry_run:
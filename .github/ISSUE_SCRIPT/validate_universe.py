@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Validate and fix every JSON file under src-data in parallel.
+
+The check is cmipld's own: each file goes through
+JSONValidator.validate_and_fix_json (the function behind
+jsontools.validate_and_fix_json and the validate_json workflow) in dry-run
+mode, which reports whether the required keys, the `id` (the file name), the
+category's `wcrp:` type or cmipld's key order need fixing. The fix is made by
+check_record, which applies the same changes in memory, and written
+atomically in the format cmipld writes. A file is only rewritten if one of
+those changed, so formatting alone never causes a rewrite. Files are spread over worker processes and the results are
+aggregated into a single report of fixed files, failing files and
+per-category timings.
+
+Usage:
+    python validate_universe.py [--src ./src-data/] [--changed-since COMMIT]
+                                [--check] [--workers N] [--report report.json]
+"""
+
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from copy import deepcopy
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+
+SKIP = ['graph.', '_context_']
+
+
+def list_files(src, changed_since=None):
+    '''The term files to validate, optionally only those changed since a commit.'''
+    if changed_since:
+        out = subprocess.run(
+            ['git', '-c', 'core.quotePath=false', 'diff', '--name-only', '--relative', changed_since, '--', src],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        files = [f for f in out.splitlines() if f.endswith('.json') and os.path.exists(f)]
+    else:
+        files = glob.glob(os.path.join(src, '*', '*.json'))
+
+    return sorted(f for f in files if not any(skip in f for skip in SKIP))
+
+
+def atomic_write(path, text):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.chmod(tmp, os.stat(path).st_mode if os.path.exists(path) else 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+_validator = None
+
+
+def validator():
+    '''The cmipld JSONValidator of this process, in dry-run mode: fixes are written by check_file.'''
+    global _validator
+    if _validator is None:
+        from cmipld.utils.validate_json import JSONValidator
+        _validator = JSONValidator('./', dry_run=True)
+    return _validator
+
+
+def check_record(data, category, stem):
+    '''
+    Fix one term in memory as validate_and_fix_json would fix it in the file
+    <category>/<stem>.json. Returns the fixed record.
+    '''
+    from cmipld.utils.validate_json import REQUIRED_KEYS, DEFAULT_VALUES
+
+    for key in REQUIRED_KEYS:
+        if key not in data:
+            data[key] = deepcopy(DEFAULT_VALUES[key])
+    data['id'] = stem
+
+    types = data.get('type', [])
+    types = list(types) if isinstance(types, list) else [types] if types else []
+    if f"wcrp:{category}" not in types:
+        data['type'] = types + [f"wcrp:{category}"]
+
+    return validator().sort_json_keys(data)
+
+
+def render(data):
+    '''A record as validate_and_fix_json writes it.'''
+    return json.dumps(data, indent=4, ensure_ascii=False) + '\n'
+
+
+def check_file(path, write=True):
+    '''
+    Validate and fix one file.
+
+    Returns (path, category, fixed, errors, seconds).
+    '''
+    start = time.perf_counter()
+    fixed, message = validator().validate_and_fix_json(path)
+    errors = [] if message in ('Fixed', 'Already valid') else [message]
+    if fixed and write:
+        # the same fix, written atomically so an interrupted run never leaves a truncated file
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f, object_pairs_hook=OrderedDict)
+        atomic_write(path, render(check_record(data, Path(path).parent.name, Path(path).stem)))
+    return path, Path(path).parent.name, fixed, errors, time.perf_counter() - start
+
+
+def run(files, workers=None, write=True):
+    '''Validate files over a process pool and aggregate the results.'''
+    report = {'fixed': [], 'failing': {}, 'categories': defaultdict(lambda: {'files': 0, 'seconds': 0.0})}
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, len(files) // ((workers or os.cpu_count() or 1) * 4))
+        for path, category, fixed, errors, seconds in pool.map(check_file, files, [write] * len(files), chunksize=chunksize):
+            stats = report['categories'][category]
+            stats['files'] += 1
+            stats['seconds'] += seconds
+            if fixed:
+                report['fixed'].append(path)
+            if errors:
+                report['failing'][path] = errors
+
+    report['categories'] = dict(report['categories'])
+    report['seconds'] = time.perf_counter() - start
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate and fix every JSON file in the universe")
+    parser.add_argument("--src", default='./src-data/', help="Directory holding the category directories")
+    parser.add_argument("--changed-since", help="Only check files changed since this commit")
+    parser.add_argument("--check", action="store_true", help="Report fixes without writing them")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per core)")
+    parser.add_argument("--report", help="Write the aggregated report as JSON to this path")
+    args = parser.parse_args()
+
+    files = list_files(args.src, args.changed_since)
+    print(f"📁 Validating {len(files)} files")
+
+    report = run(files, workers=args.workers, write=not args.check)
+
+    for category, stats in sorted(report['categories'].items()):
+        print(f"   {category:45} {stats['files']:6} files {stats['seconds']:8.3f}s")
+    for path, errors in sorted(report['failing'].items()):
+        print(f"❌ {path}: {'; '.join(errors)}")
+    print(f"🔧 {'Would fix' if args.check else 'Fixed'}: {len(report['fixed'])} files")
+    print(f"❌ Failing: {len(report['failing'])} files")
+    print(f"⏱️  {report['seconds']:.2f}s")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    return 1 if report['failing'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
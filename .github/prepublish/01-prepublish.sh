@@ -0,0 +1,5 @@
+#!/bin/bash
+# Create the extensionless, _context.json and ROR-keyed copies in one pass.
+# See prepublish.py for details.
+
+python3 "$(dirname "$0")/prepublish.py" .
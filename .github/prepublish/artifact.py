@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Single-file SQLite distribution of the production tree.
+
+build() packs every term of every category into one SQLite database
+(`universe.sqlite`) with indexes on id, validation-key, type and ror, so
+consumers can fetch one file instead of thousands of small JSON documents and
+their aliases. CI builds it outside the tree and publishes it as the asset of
+the `universe` release, so the binary is never committed to production.
+
+Universe opens the artifact read-only and immutable with SQLite's memory
+mapping enabled for the whole file: pages are read straight from the mapped
+file, with no copies through the page cache and no per-file opens. Terms are
+stored as compact JSON and decoded only when returned.
+
+Usage:
+    python artifact.py [root] [--output universe.sqlite]
+
+    from artifact import Universe
+    universe = Universe('universe.sqlite')
+    universe.get('organisation', 'mohc')
+    universe.by_ror('02wn1k260')
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from graph import context_file, is_alias
+
+
+ARTIFACT = 'universe.sqlite'
+
+SCHEMA = '''
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+CREATE TABLE terms (
+    category TEXT NOT NULL,
+    id TEXT NOT NULL,
+    validation_key TEXT,
+    ror TEXT,
+    json TEXT NOT NULL,
+    PRIMARY KEY (category, id)
+) WITHOUT ROWID;
+CREATE TABLE types (type TEXT NOT NULL, category TEXT NOT NULL, id TEXT NOT NULL);
+CREATE TABLE contexts (category TEXT PRIMARY KEY, json TEXT NOT NULL) WITHOUT ROWID;
+'''
+
+INDEXES = '''
+CREATE INDEX terms_id ON terms (id);
+CREATE INDEX terms_validation_key ON terms (validation_key);
+CREATE INDEX terms_ror ON terms (ror);
+CREATE INDEX types_type ON types (type);
+'''
+
+
+def iter_terms(root):
+    '''Yield (category, file name, data) for every term file of every category.'''
+    for category in sorted(os.listdir(root)):
+        directory = os.path.join(root, category)
+        if category.startswith('.') or not os.path.isdir(directory) or not context_file(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith('.json') or name.startswith('_'):
+                continue
+            with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                try:
+                    data = json.load(f)
+                except ValueError:
+                    print(f"⚠️  Failed to parse {category}/{name}, skipping")
+                    continue
+            if isinstance(data, dict) and data.get('id') and not is_alias(name, data):
+                yield category, data
+
+
+def build(root='.', output=None):
+    '''Write the artifact for the tree at root. Returns the number of terms packed.'''
+    output = output or os.path.join(root, ARTIFACT)
+    tmp = output + '.tmp'
+    if os.path.exists(tmp):
+        os.remove(tmp)
+
+    db = sqlite3.connect(tmp)
+    db.executescript('PRAGMA journal_mode=OFF; PRAGMA synchronous=OFF; PRAGMA page_size=4096;' + SCHEMA)
+
+    seen = set()
+    with db:
+        for category, data in iter_terms(root):
+            data.pop('@context', None)
+            types = data.get('type', [])
+            ror = data.get('ror')
+            # a later file with the same id replaces the term, and with it its types; types has
+            # no index until the end, so only the rare duplicate pays for the scan
+            if (category, data['id']) in seen:
+                db.execute('DELETE FROM types WHERE category = ? AND id = ?', (category, data['id']))
+            seen.add((category, data['id']))
+            db.execute('INSERT OR REPLACE INTO terms VALUES (?, ?, ?, ?, ?)', (
+                category, data['id'], data.get('validation-key'),
+                ror if isinstance(ror, str) and ror != 'pending' else None,
+                json.dumps(data, ensure_ascii=False, separators=(',', ':')),
+            ))
+            db.executemany('INSERT INTO types VALUES (?, ?, ?)',
+                           [(t, category, data['id']) for t in ([types] if isinstance(types, str) else types)])
+        count = len(seen)
+
+        for category in {row[0] for row in db.execute('SELECT DISTINCT category FROM terms')}:
+            with open(context_file(os.path.join(root, category)), 'r', encoding='utf-8') as f:
+                db.execute('INSERT INTO contexts VALUES (?, ?)', (category, f.read()))
+        db.executemany('INSERT INTO meta VALUES (?, ?)', [('terms', str(count)), ('format', '1')])
+
+    db.executescript(INDEXES + 'ANALYZE; VACUUM;')
+    db.close()
+    os.replace(tmp, output)
+    return count
+
+
+class Universe:
+    '''Read-only, memory-mapped access to a universe.sqlite artifact.'''
+
+    def __init__(self, path=ARTIFACT):
+        self.db = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+        self.db.execute(f'PRAGMA mmap_size={os.path.getsize(path)}')
+
+    def _terms(self, sql, *params):
+        return [json.loads(row[0]) for row in self.db.execute(sql, params)]
+
+    def __len__(self):
+        return self.db.execute('SELECT count(*) FROM terms').fetchone()[0]
+
+    def categories(self):
+        return [row[0] for row in self.db.execute('SELECT DISTINCT category FROM terms ORDER BY category')]
+
+    def context(self, category):
+        row = self.db.execute('SELECT json FROM contexts WHERE category = ?', (category,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get(self, category, id):
+        row = self.db.execute('SELECT json FROM terms WHERE category = ? AND id = ?', (category, id)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def category(self, category):
+        return self._terms('SELECT json FROM terms WHERE category = ? ORDER BY id', category)
+
+    def by_id(self, id):
+        return self._terms('SELECT json FROM terms WHERE id = ?', id)
+
+    def by_validation_key(self, key):
+        return self._terms('SELECT json FROM terms WHERE validation_key = ?', key)
+
+    def by_ror(self, ror):
+        row = self.db.execute('SELECT json FROM terms WHERE ror = ?', (ror.split('ror.org/')[-1],)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def by_type(self, type):
+        return self._terms('SELECT t.json FROM types y JOIN terms t ON t.category = y.category AND t.id = y.id '
+                           'WHERE y.type = ?', type)
+
+    def close(self):
+        self.db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack the production tree into a single indexed SQLite artifact")
+    parser.add_argument("root", nargs='?', default='.', help="Root of the production tree")
+    parser.add_argument("--output", help=f"Artifact path (default: <root>/{ARTIFACT})")
+    args = parser.parse_args()
+
+    output = args.output or os.path.join(args.root, ARTIFACT)
+    count = build(args.root, output)
+    print(f"📦 {count} terms packed into {output} ({os.path.getsize(output) / 1024:.0f} KiB)")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Incremental replacement for `ld2graph <dir>` over the production tree.
+
+Each directory's graph.jsonld holds its resolved `_context` and every JSON
+file of the directory, minus its own @context, as the @graph - the same
+document ld2graph writes, but with one node per line:
+
+    {
+      "@context": {...},
+      "@graph": [
+        {node of a.json},
+        {node of b.json}
+      ]
+    }
+
+A manifest records, per directory, the context hash and the git blob id of
+every file and of the graph.jsonld it wrote. Blob ids are content hashes, so
+they survive a fresh checkout, and for tracked files git reads them from its
+index without opening the files. On a rerun only files whose blob id changed
+are read and recompacted (their @context dropped and the node re-serialised
+on one line, which is all the compaction ld2graph applies: the files are
+already written in the compact form of their directory's context); every
+other node line is copied as-is from the previous graph.jsonld, and
+directories with no changes are not rewritten at all. Directories are
+independent, so --workers builds several at once.
+
+The manifest is not part of the tree: CI keeps it between runs with
+actions/cache.
+
+Usage:
+    python graph.py [dir ...] [--root .] [--workers N] [--manifest .graph-manifest.json] [--full]
+"""
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+import subprocess
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+
+GRAPH = 'graph.jsonld'
+CONTEXTS = ['_context', '_context_']
+HEADER = '  "@graph": ['
+FOOTER = '  ]'
+
+
+def merge(base, other):
+    '''Recursive object merge, as jq's `*` does it.'''
+    out = dict(base)
+    for key, value in other.items():
+        if isinstance(value, dict) and isinstance(out.get(key), dict):
+            out[key] = merge(out[key], value)
+        else:
+            out[key] = value
+    return out
+
+
+def resolve_context(path, seen=()):
+    '''The @context of a context file with local file references merged in.'''
+    if path in seen or not os.path.isfile(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        context = json.load(f).get('@context', {})
+
+    merged = {}
+    for item in context if isinstance(context, list) else [context]:
+        if isinstance(item, dict):
+            merged = merge(merged, item)
+        elif isinstance(item, str) and not item.startswith('http'):
+            ref = os.path.normpath(os.path.join(os.path.dirname(path), item))
+            merged = merge(merged, resolve_context(ref, (*seen, path)))
+    return merged
+
+
+def context_file(directory):
+    for name in CONTEXTS:
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def is_alias(name, data):
+    '''ROR-keyed copies made by prepublish (organisation/<ror>.json) are not nodes.'''
+    ror = data.get('ror') if isinstance(data, dict) else None
+    return isinstance(ror, str) and name[:-5] == ror.split('ror.org/')[-1] and data.get('id') != name[:-5]
+
+
+def git_blob(content):
+    '''The git blob id of content (bytes).'''
+    return hashlib.sha1(b'blob %d\0' % len(content) + content).hexdigest()
+
+
+def file_blob(path):
+    with open(path, 'rb') as f:
+        return git_blob(f.read())
+
+
+def blob_ids(root):
+    '''
+    {path relative to root: git blob id} of the files under root.
+
+    Tracked files come from the index; only files modified since or untracked
+    are hashed, by git hash-object. Outside a git work tree this returns {} and
+    build() hashes every file itself.
+    '''
+    def git(*args, input=None):
+        return subprocess.run(['git', '-C', root, *args], input=input, capture_output=True, check=True).stdout
+
+    try:
+        staged = git('ls-files', '-s', '-z')
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return {}
+
+    blobs = {}
+    for record in staged.split(b'\0'):
+        if record:
+            meta, path = record.split(b'\t', 1)
+            blobs[path.decode()] = meta.split()[1].decode()
+
+    dirty = [path for path in git('ls-files', '-z', '-m', '-o', '--exclude-standard').decode().split('\0')
+             if path and os.path.isfile(os.path.join(root, path))]
+    if dirty:
+        hashed = git('hash-object', '--no-filters', '--stdin-paths', input='\n'.join(dirty).encode()).decode().split()
+        blobs.update(zip(dirty, hashed))
+    return blobs
+
+
+def node_line(path, name):
+    '''The recompacted node of one file, or None if it is not part of the graph.'''
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except ValueError:
+        print(f"⚠️  Failed to parse {path}, skipping", file=sys.stderr)
+        return None
+    if not isinstance(data, dict) or is_alias(name, data):
+        return None
+    data.pop('@context', None)
+    return json.dumps(data, ensure_ascii=False)
+
+
+def previous_nodes(graph_path, entry, blob):
+    '''Map file name -> node line from the last graph.jsonld, if it is the one the manifest describes.'''
+    if not entry or not blob or entry.get('graph') != blob:
+        return {}
+
+    try:
+        with open(graph_path, 'r', encoding='utf-8') as f:
+            lines = f.read().split('\n')
+    except FileNotFoundError:
+        return {}
+    try:
+        start = lines.index(HEADER) + 1
+    except ValueError:
+        return {}
+
+    names = [name for name, fingerprint in sorted(entry['files'].items()) if fingerprint[1]]
+    nodes = [line.strip().rstrip(',') for line in lines[start:start + len(names)]]
+    return dict(zip(names, nodes)) if len(nodes) == len(names) else {}
+
+
+def build(directory, entry=None, full=False, blobs=None):
+    '''
+    Rebuild directory/graph.jsonld if anything in it changed.
+
+    blobs maps the names of the directory's files to their git blob ids
+    (from blob_ids); a file missing from it is hashed here.
+
+    Returns (directory, manifest entry, files re-read, whether the graph was written).
+    '''
+    blobs = blobs or {}
+    ctx_path = context_file(directory)
+    if ctx_path is None:
+        return directory, None, 0, False
+
+    context = resolve_context(ctx_path)
+    context_text = json.dumps(context, indent=2, ensure_ascii=False, sort_keys=True)
+    context_hash = hashlib.sha1(context_text.encode()).hexdigest()
+
+    graph_path = os.path.join(directory, GRAPH)
+    entry = None if full else entry
+    old = (entry or {}).get('files', {})
+    graph_blob = blobs.get(GRAPH) or (file_blob(graph_path) if entry and os.path.isfile(graph_path) else None)
+    reusable = previous_nodes(graph_path, entry, graph_blob)
+
+    files, nodes, reread, changed = {}, [], 0, context_hash != (entry or {}).get('context')
+    for item in sorted(os.scandir(directory), key=lambda item: item.name):
+        name = item.name
+        if not name.endswith('.json') or name.startswith('_') or not item.is_file():
+            continue
+        blob = blobs.get(name) or file_blob(item.path)
+        before = old.get(name)
+
+        if before and before[0] == blob and (name in reusable or not before[1]):
+            files[name] = before
+            line = reusable.get(name)
+        else:
+            line = node_line(item.path, name)
+            reread += 1
+            files[name] = [blob, line is not None]
+            changed = changed or before != files[name]
+
+        if line is not None:
+            nodes.append(line)
+
+    changed = changed or set(files) != set(old) or not reusable and any(f[1] for f in files.values())
+    if not changed and os.path.exists(graph_path):
+        return directory, dict(entry, files=files), reread, False
+
+    body = [f"    {line}," for line in nodes]
+    if body:
+        body[-1] = body[-1][:-1]
+    text = '\n'.join(['{', '  "@context": ' + context_text.replace('\n', '\n  ') + ',', HEADER, *body, FOOTER, '}', ''])
+
+    content = text.encode('utf-8')
+    tmp = graph_path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(content)
+    os.replace(tmp, graph_path)
+
+    return directory, {'context': context_hash, 'files': files, 'graph': git_blob(content)}, reread, True
+
+
+def load_manifest(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_manifest(path, manifest):
+    with open(path, 'w') as f:
+        json.dump(manifest, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally rebuild the per-directory graph.jsonld files")
+    parser.add_argument("directories", nargs='*', help="Directories to build (default: every directory with a _context)")
+    parser.add_argument("--root", default='.', help="Tree to look for directories in")
+    parser.add_argument("--workers", type=int, default=1, help="Directories to build in parallel")
+    parser.add_argument("--manifest", default='.graph-manifest.json', help="Fingerprint manifest")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest and rebuild every graph")
+    args = parser.parse_args()
+
+    directories = [d.rstrip('/') for d in args.directories] or sorted(
+        item.path for item in os.scandir(args.root)
+        if item.is_dir() and not item.name.startswith('.') and context_file(item.path)
+    )
+
+    manifest = load_manifest(args.manifest)
+    blobs = defaultdict(dict)
+    for path, blob in blob_ids(args.root).items():
+        directory, name = os.path.split(path)
+        blobs[os.path.normpath(os.path.join(args.root, directory))][name] = blob
+    jobs = [(d, manifest.get(os.path.normpath(d)), args.full, blobs.get(os.path.normpath(d), {})) for d in directories]
+
+    if args.workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(build, *zip(*jobs)))
+    else:
+        results = [build(*job) for job in jobs]
+
+    written = reread = 0
+    for directory, entry, count, wrote in results:
+        if entry is None:
+            print(f"⚠️  {directory}: no context file, skipped")
+            continue
+        manifest[os.path.normpath(directory)] = entry
+        reread += count
+        if wrote:
+            written += 1
+            print(f"✅ {directory}/{GRAPH} ({sum(f[1] for f in entry['files'].values())} nodes, {count} re-read)")
+
+    save_manifest(args.manifest, manifest)
+    print(f"📊 {written} of {len(results)} graphs rewritten, {reread} files re-read")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Single pass prepublish step for the production tree.
+
+Walks the tree once and creates, for every file that needs one:
+    <name>.json         -> <name>               (not in docs/ or hidden paths)
+    _context            -> _context.json
+    organisation/*.json -> <ror>.json and <ror>  (ror read from the file)
+
+Outputs are hardlinks where the filesystem allows it and copies otherwise.
+An output is never used as a source itself (a checked-out _context.json is
+not copied back over _context, nor a ROR alias onto its extensionless
+twin), so no file is written while another job reads it. Outputs that
+already hold the same content as their source are left alone, so a rerun on
+an unchanged tree does no writes.
+
+Usage:
+    python prepublish.py [root] [--workers N]
+"""
+
+import os
+import sys
+import json
+import shutil
+import filecmp
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+
+def up_to_date(src, dst):
+    # compared by content: mtimes say nothing after a fresh checkout
+    try:
+        return os.path.samefile(src, dst) or filecmp.cmp(src, dst, shallow=False)
+    except FileNotFoundError:
+        return False
+
+
+def link(src, dst):
+    '''Hardlink dst to src, falling back to a copy. Returns what was done.'''
+    if up_to_date(src, dst):
+        return 'skipped'
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+        return 'linked'
+    except OSError:
+        shutil.copy2(src, dst)
+        return 'copied'
+
+
+def ror_key(path):
+    '''The ROR id of an organisation file, as ror-links.sh extracted it.'''
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            ror = json.load(f).get('ror')
+    except (ValueError, AttributeError, OSError):
+        return None
+    if not ror or not isinstance(ror, str) or ror == 'pending':
+        return None
+    return ror.split('ror.org/')[-1]
+
+
+def walk(root):
+    '''Yield (src, dst) link jobs and the organisation files to read a ror from.'''
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d != '.git']
+
+        rel = os.path.relpath(dirpath, root)
+        parts = [] if rel == '.' else rel.split(os.sep)
+        hidden = any(p.startswith('.') for p in parts)
+        docs = 'docs' in parts
+
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+
+            if name == '_context':
+                yield 'link', (path, path + '.json')
+
+            elif name == '_context.json' and '_context' in filenames:
+                continue    # the output of the job above
+
+            elif name.endswith('.json') and not hidden and not docs and not name.startswith('.'):
+                yield 'link', (path, path[:-len('.json')])
+                if parts == ['organisation']:
+                    yield 'ror', path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create extensionless, .json and ROR-keyed aliases")
+    parser.add_argument("root", nargs='?', default='.', help="Root of the production tree")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Worker threads")
+    args = parser.parse_args()
+
+    links, organisations = {}, []
+    for kind, job in walk(args.root):
+        if kind == 'link':
+            links[job[1]] = job[0]
+        else:
+            organisations.append(job)
+
+    results = Counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        # organisation files are parsed once each, for their ror
+        for path, ror in zip(organisations, pool.map(ror_key, organisations)):
+            # ror aliases left by a previous run are not sources themselves
+            if ror and os.path.basename(path) != ror + '.json':
+                directory = os.path.dirname(path)
+                links[os.path.join(directory, ror + '.json')] = path
+                links[os.path.join(directory, ror)] = path
+
+        # a file written by one job is never read by another
+        links = {dst: src for dst, src in links.items() if src not in links}
+        results.update(pool.map(lambda dst: link(links[dst], dst), links))
+
+    print(f"Prepublish: {results['linked']} linked, {results['copied']} copied, "
+          f"{results['skipped']} up to date ({len(organisations)} organisation files read)")
+
+
+if __name__ == '__main__':
+    sys.exit(main())